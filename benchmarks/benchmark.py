@@ -0,0 +1,250 @@
+# Duck Shooter benchmark suite
+#
+# Runs scripted scenarios against main.py's game logic under the SDL dummy video/audio drivers,
+# reports ticks/sec, p50/p99 frame times split into update/collision/draw and peak memory,
+# writes the results as JSON and compares them against a stored baseline.
+#
+#   python benchmarks/benchmark.py                    # run everything, compare with baseline.json
+#   python benchmarks/benchmark.py --scenario level_1 --ticks 300
+#   python benchmarks/benchmark.py --update-baseline  # accept the current numbers
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame  # noqa: E402
+import main  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_PATH = os.path.join(BENCH_DIR, "results.json")
+
+# Which PhaseTimer phases count towards each reported group
+PHASE_GROUPS = {
+    "update": ("input", "player", "ducks", "powerups", "particles"),
+    "collision": ("projectiles",),
+    "draw": ("draw_background", "draw_entities", "draw_hud", "draw_menu", "present"),
+}
+
+# Scripted shooter: aims at one duck per tick, rotating through the flock, and clicks when it can fire
+def aim_and_shoot(session, tick, weapon=None):
+    ducks = session.ducks
+    duck = ducks[tick % len(ducks)]
+    target = (int(duck.x + duck.width // 2), int(duck.y + duck.height // 2))
+    clicks = [target] if session.player.current_weapon.can_shoot() else []
+    return main.TickInput(target, clicks, weapon)
+
+# Give every weapon unlimited ammo so long runs keep shooting
+def unlimited_ammo(session):
+    for weapon in session.player.weapons.values():
+        weapon.ammo = -1
+
+def setup_level(level):
+    def setup(seed):
+        session = main.GameSession(difficulty=2, seed=seed)
+        unlimited_ammo(session)
+        session.level = level
+        session.ducks_needed_for_next_level = 10 * level
+        session.time_remaining = 10**6
+        while len(session.ducks) < session.get_duck_count():
+            session.add_duck()
+        return session
+    return setup
+
+def setup_multishot(seed):
+    session = main.GameSession(difficulty=3, seed=seed)
+    unlimited_ammo(session)
+    session.time_remaining = 10**6
+    for powerup_type in (main.PowerUpType.MULTI_SHOT, main.PowerUpType.RAPID_FIRE,
+                         main.PowerUpType.DOUBLE_DAMAGE):
+        session.player.activate_powerup(powerup_type, 10**6)
+    return session
+
+# Switch weapons every half second so every projectile type is exercised
+def multishot_inputs(session, tick):
+    weapon_types = list(main.WeaponType)
+    weapon = weapon_types[(tick // 30) % len(weapon_types)] if tick % 30 == 0 else None
+    inputs = aim_and_shoot(session, tick, weapon)
+    return main.TickInput(inputs.mouse_pos, [inputs.mouse_pos], weapon)
+
+def setup_flock(count, use_entity_store):
+    def setup(seed):
+        session = main.GameSession(difficulty=1, use_entity_store=use_entity_store, seed=seed)
+        unlimited_ammo(session)
+        session.time_remaining = 10**6
+        session.ducks_needed_for_next_level = 10**9  # Keep the flock size fixed
+        while len(session.ducks) < count:
+            session.add_duck()
+        return session
+    return setup
+
+# Level 1 with about 20k particles in the air: a dozen feather bursts per tick on top of the shooting
+def particle_inputs(session, tick):
+    colors = main.get_duck_colors(main.DuckType.NORMAL)
+    for i in range(12):
+        main.particles.emit("feather_burst", random.uniform(0, main.SCREEN_WIDTH), random.uniform(50, 500), colors)
+    return aim_and_shoot(session, tick)
+
+# Scenario name -> (setup(seed) returning a GameSession or None for the menu, input function)
+SCENARIOS = {
+    "idle_menu": (None, None),
+    "level_1": (setup_level(1), aim_and_shoot),
+    "level_10": (setup_level(10), aim_and_shoot),
+    "multishot": (setup_multishot, multishot_inputs),
+    "ducks_1k": (setup_flock(1000, False), aim_and_shoot),
+    "ducks_10k": (setup_flock(10000, True), aim_and_shoot),
+    "particles_20k": (setup_level(1), particle_inputs),
+}
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+# Run one scenario for the given number of ticks and return its PhaseTimer frames and wall time
+def run_ticks(name, ticks, seed, ui):
+    setup, make_inputs = SCENARIOS[name]
+    random.seed(seed)
+    timer = main.PhaseTimer()
+    screen = pygame.display.get_surface()
+
+    if setup is None:
+        start = time.perf_counter()
+        for tick in range(ticks):
+            timer.begin_frame()
+            # Composite the whole menu every tick; with a still mouse it would otherwise come from the cache
+            ui.redraw()
+            ui.draw_menu(screen)
+            timer.mark("draw_menu")
+            ui.present()
+            timer.mark("present")
+            timer.end_frame()
+        return timer.frames, time.perf_counter() - start
+
+    session = setup(seed)
+    main.particles.clear()
+    # Full redraws every frame, so a slow draw_hud can't hide behind dirty-rect caching
+    renderer = main.GameRenderer(screen, ui, dirty_rects=False)
+    session.phase_timer = timer
+    renderer.phase_timer = timer
+
+    start = time.perf_counter()
+    for tick in range(ticks):
+        timer.begin_frame()
+        session.step(make_inputs(session, tick))
+        main.particles.update()
+        timer.mark("particles")
+        renderer.draw(session)
+        renderer.present()
+        timer.end_frame()
+    return timer.frames, time.perf_counter() - start
+
+def run_scenario(name, ticks, seed, ui, measure_memory=True):
+    frames, elapsed = run_ticks(name, ticks, seed, ui)
+    result = {"ticks": ticks, "ticks_per_sec": round(ticks / elapsed, 1)}
+
+    for group, phases in PHASE_GROUPS.items():
+        times = [sum(frame.get(phase, 0.0) for phase in phases) * 1000 for frame in frames]
+        result[group] = {"p50_ms": round(percentile(times, 0.5), 4), "p99_ms": round(percentile(times, 0.99), 4)}
+    totals = [sum(frame.values()) * 1000 for frame in frames]
+    result["frame"] = {"p50_ms": round(percentile(totals, 0.5), 4), "p99_ms": round(percentile(totals, 0.99), 4)}
+
+    # Memory is traced in a separate, shorter run so tracing overhead doesn't skew the timings
+    if measure_memory:
+        tracemalloc.start()
+        run_ticks(name, max(1, ticks // 4), seed, ui)
+        result["peak_memory_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+# Compare results with the baseline and return a list of human readable regressions
+# p99 is noisier than p50, so it gets its own (looser) tolerance
+def find_regressions(results, baseline, tolerance, p99_tolerance):
+    regressions = []
+    for name, result in results["scenarios"].items():
+        expected = baseline.get("scenarios", {}).get(name)
+        if expected is None:
+            continue
+        if result["ticks_per_sec"] < expected["ticks_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: ticks/sec {result['ticks_per_sec']} < baseline {expected['ticks_per_sec']}")
+        for group in list(PHASE_GROUPS) + ["frame"]:
+            for stat, allowed in (("p50_ms", tolerance), ("p99_ms", p99_tolerance)):
+                value = result[group][stat]
+                limit = expected[group][stat] * (1 + allowed)
+                # Ignore sub-0.05 ms phases, they are dominated by timer noise
+                if value > limit and value - expected[group][stat] > 0.05:
+                    regressions.append(f"{name}: {group} {stat} {value} > baseline {expected[group][stat]}")
+        if "peak_memory_kb" in result and "peak_memory_kb" in expected:
+            if result["peak_memory_kb"] > expected["peak_memory_kb"] * (1 + tolerance) + 64:
+                regressions.append(f"{name}: peak memory {result['peak_memory_kb']} KB > baseline "
+                                   f"{expected['peak_memory_kb']} KB")
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Duck Shooter benchmark suite")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--ticks", type=int, default=600, help="Simulation ticks per scenario")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=RESULTS_PATH, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5, help="Allowed p99 slowdown before failing")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurement")
+    args = parser.parse_args()
+
+    main.create_window()
+    main.particles.setup()
+    ui = main.UI()
+
+    results = {
+        "meta": {"python": platform.python_version(), "pygame": pygame.version.ver,
+                 "machine": platform.machine(), "ticks": args.ticks, "seed": args.seed},
+        "scenarios": {},
+    }
+    for name in args.scenario or list(SCENARIOS):
+        result = run_scenario(name, args.ticks, args.seed, ui, not args.no_memory)
+        results["scenarios"][name] = result
+        print(f"{name:12s} {result['ticks_per_sec']:>10.1f} ticks/s  "
+              f"update p99 {result['update']['p99_ms']:.3f} ms  "
+              f"collision p99 {result['collision']['p99_ms']:.3f} ms  "
+              f"draw p99 {result['draw']['p99_ms']:.3f} ms  "
+              f"peak {result.get('peak_memory_kb', 0):.0f} KB")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance, args.p99_tolerance)
+    if regressions:
+        print("PERFORMANCE REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,212 @@
+# Duck Shooter binary format checks
+#
+# Plays seeded bot games under the SDL dummy video/audio drivers and checks that the binary formats
+# reproduce them exactly: the varint/zigzag codec, replay recording and seeking, snapshot
+# save -> restore -> save, and `main.py --replay` verification. Every game check runs with both the
+# list-based entities and the NumPy entity store. It also drives InputCollector with a simulated frame
+# clock to check the click times recorded within each tick. Exits with status 1 if any check fails.
+#
+#   python benchmarks/check_formats.py
+#   python benchmarks/check_formats.py --seed 7 --ticks 1800
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+# Must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT_DIR)
+
+import pygame  # noqa: E402
+import main  # noqa: E402
+
+VARINT_VALUES = [0, 1, 63, 64, 127, 128, 255, 300, 16383, 16384, 2**31 - 1, 2**32, 2**63]
+SNAPSHOT_TICKS = (1, 250, 777)  # Ticks at which a snapshot is taken mid-game
+SNAPSHOT_FOLLOW_TICKS = 300  # Ticks the restored copy is stepped alongside the original
+# Simulated frame lengths in whole milliseconds, as clock.tick() reports them: (label, shortest, longest)
+CLICK_FRAME_RATES = [("60 FPS", 16, 17), ("30 FPS", 33, 34), ("uneven", 4, 45)]
+CLICK_FRAMES = 3000
+
+failures = []
+
+def check(condition, message):
+    if not condition:
+        failures.append(message)
+        print(f"  FAIL {message}")
+    return condition
+
+def check_varints():
+    for value in VARINT_VALUES:
+        data = bytearray()
+        main.write_varint(data, value)
+        check(main.read_varint(data, 0) == (value, len(data)), f"varint {value} round trip")
+        check(len(data) == max(1, (value.bit_length() + 6) // 7), f"varint {value} length {len(data)}")
+    for value in [0, 1, -1, 63, -64, 64, -65, 1000, -1000, 2**40, -2**40]:
+        data = bytearray()
+        main.write_signed_varint(data, value)
+        check(main.read_signed_varint(data, 0) == (value, len(data)), f"zigzag {value} round trip")
+        check((len(data) == 1) == (-64 <= value < 64), f"zigzag {value} length {len(data)}")
+    # Several values back to back decode from consecutive offsets
+    data = bytearray()
+    for value in VARINT_VALUES:
+        main.write_varint(data, value)
+    offset = 0
+    decoded = []
+    for value in VARINT_VALUES:
+        value, offset = main.read_varint(data, offset)
+        decoded.append(value)
+    check(decoded == VARINT_VALUES and offset == len(data), "varint stream round trip")
+
+# Bot input with the clicks spread over the tick, quantized like InputCollector does
+def get_bot_input(bot, session, rng):
+    inputs = bot.get_input(session)
+    clicks = [(x, y, round(rng.random() * main.CLICK_OFFSET_STEPS) / main.CLICK_OFFSET_STEPS)
+              for x, y, tick_offset in inputs.clicks]
+    return main.TickInput(inputs.mouse_pos, clicks, inputs.weapon)
+
+# Record a seeded bot game; returns the replay bytes and the input of every tick
+def record_game(use_entity_store, seed, difficulty, ticks):
+    session = main.GameSession(difficulty, use_entity_store, seed)
+    session.recorder = main.InputRecorder(session)
+    bot = main.LeadingBot(random.Random(seed))
+    rng = random.Random(seed + 1)
+    inputs = []
+    while not session.game_over and session.game_timer < ticks:
+        inputs.append(get_bot_input(bot, session, rng))
+        session.step(inputs[-1])
+    session.recorder.finish(session)
+    return bytes(session.recorder.data), inputs, session
+
+def check_replay(data, inputs, session, label):
+    player = main.ReplayPlayer(data)
+    check(len(player.inputs) == len(inputs), f"{label}: replay holds {len(player.inputs)} of {len(inputs)} ticks")
+    check([(tick.mouse_pos, tick.clicks, tick.weapon) for tick in player.inputs] ==
+          [(tick.mouse_pos, tick.clicks, tick.weapon) for tick in inputs], f"{label}: decoded inputs")
+    replayed = player.run()
+    check(player.matches_recording(), f"{label}: replay matches the recording")
+    check(replayed.save_snapshot() == session.save_snapshot(), f"{label}: replayed state equals the live state")
+
+    # Seeking backwards restores a checkpoint; it must land on the same state as a straight run
+    for tick in (len(inputs) // 3, len(inputs) // 2 + 7, 1):
+        player.seek(tick)
+        fresh = main.ReplayPlayer(data)
+        fresh.run(tick)
+        check(player.session.get_checksum() == fresh.session.get_checksum() and
+              player.session.save_snapshot() == fresh.session.save_snapshot(), f"{label}: seek to {tick}")
+
+def check_snapshots(data, inputs, label):
+    player = main.ReplayPlayer(data)
+    for tick in SNAPSHOT_TICKS:
+        if tick >= len(inputs):
+            continue
+        session = player.seek(tick)
+        snapshot = session.save_snapshot()
+        restored = main.GameSession(session.difficulty, session.use_entity_store, session.seed + 1)
+        restored.restore_snapshot(snapshot)
+        check(restored.save_snapshot() == snapshot, f"{label}: snapshot round trip at tick {tick}")
+        check(restored.get_checksum() == session.get_checksum(), f"{label}: restored checksum at tick {tick}")
+
+        # The restored copy must keep playing exactly like the original
+        copy = main.ReplayPlayer(data)
+        copy.session = restored
+        copy.tick = tick
+        player.run(tick + SNAPSHOT_FOLLOW_TICKS)
+        copy.run(tick + SNAPSHOT_FOLLOW_TICKS)
+        check(copy.session.save_snapshot() == player.session.save_snapshot(),
+              f"{label}: restored game follows the original from tick {tick}")
+
+# Run `main.py --replay` on the recording, on a copy whose final checksum was tampered with and on
+# damaged copies
+def check_replay_command(data, label):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "game.dsr")
+        with open(path, "wb") as f:
+            f.write(data)
+        result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, "main.py"), "--replay", path],
+                                capture_output=True, text=True)
+        check(result.returncode == 0 and "matches" in result.stdout, f"{label}: --replay verifies the recording")
+
+        with open(path, "wb") as f:
+            f.write(data[:-4] + bytes(byte ^ 0xFF for byte in data[-4:]))
+        result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, "main.py"), "--replay", path],
+                                capture_output=True, text=True)
+        check(result.returncode == 1, f"{label}: --replay rejects a wrong checksum")
+        
+        # Truncated and foreign files are reported in one line rather than a traceback
+        for name, bad_data in (("truncated", data[:len(data) // 2]), ("header only", data[:5]),
+                               ("wrong magic", b"XXXX" + data[4:])):
+            with open(path, "wb") as f:
+                f.write(bad_data)
+            result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, "main.py"), "--replay", path],
+                                    capture_output=True, text=True)
+            check(result.returncode == 1 and "Traceback" not in result.stderr,
+                  f"{label}: --replay reports a {name} file")
+
+# Feed one click every few frames through InputCollector the way the game loop does, and check that
+# each lands in that frame's ticks with offsets covering the whole tick rather than bunching up
+def check_click_offsets(ui):
+    rng = random.Random(0)
+    for label, shortest, longest in CLICK_FRAME_RATES:
+        inputs = main.InputCollector()
+        now = inputs.last_poll
+        accumulator = 0.0
+        offsets = []
+        clicks = 0
+        late = 0
+        for frame in range(CLICK_FRAMES):
+            elapsed = rng.randint(shortest, longest) / 1000
+            accumulator += elapsed
+            now += elapsed
+            events = []
+            if rng.random() < 0.3:
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(main.SCREEN_WIDTH // 2, 300), button=1))
+                clicks += 1
+            inputs.collect(events, ui, now)
+            ticks = 0
+            while accumulator >= main.TICK_TIME and ticks < main.MAX_CATCH_UP_TICKS:
+                offsets.extend(tick_offset for x, y, tick_offset in inputs.get_tick_input(now - accumulator).clicks)
+                accumulator -= main.TICK_TIME
+                ticks += 1
+            if ticks:
+                late += len(inputs.clicks)
+        check(len(offsets) + len(inputs.clicks) == clicks, f"clicks at {label}: {len(offsets)} of {clicks} delivered")
+        check(late == 0, f"clicks at {label}: {late} clicks waited past the frame that polled them")
+        check(all(0.0 <= tick_offset < 1.0 for tick_offset in offsets), f"clicks at {label}: offsets within [0, 1)")
+        quarters = [sum(1 for tick_offset in offsets if i / 4 <= tick_offset < (i + 1) / 4) for i in range(4)]
+        check(min(quarters) >= len(offsets) / 10, f"clicks at {label}: offsets per quarter tick {quarters}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Duck Shooter binary format checks")
+    parser.add_argument("--seed", type=int, default=2)
+    parser.add_argument("--difficulty", type=int, default=2, choices=[1, 2, 3])
+    parser.add_argument("--ticks", type=int, default=3600, help="Longest game played per mode")
+    args = parser.parse_args()
+
+    print("varint/zigzag codec")
+    check_varints()
+    print("click offsets")
+    main.create_window()
+    check_click_offsets(main.UI())
+    modes = [("list", False)]
+    if main.numpy is not None:
+        modes.append(("entity store", True))
+    for label, use_entity_store in modes:
+        print(f"{label} mode")
+        data, inputs, session = record_game(use_entity_store, args.seed, args.difficulty, args.ticks)
+        check_replay(data, inputs, session, label)
+        check_snapshots(data, inputs, label)
+        check_replay_command(data, label)
+
+    if failures:
+        print(f"{len(failures)} checks failed")
+        return 1
+    print("All format checks passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,22 +1,53 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Keep stdout clean for --headless JSON lines
 import pygame
 import sys
 import math
 import random
-import os
+import argparse
+import bisect
+import cProfile
+import itertools
+import json
+import multiprocessing
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import wave
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from enum import Enum
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Command-line modes that never open a window or play a sound (see the bottom of the file)
+WINDOWLESS_ARGS = ("--headless", "--balance", "--replay")
+
 # Initialize Pygame
-pygame.init()
-pygame.mixer.init()  # Initialize sound mixer
+if any(arg in WINDOWLESS_ARGS for arg in sys.argv[1:]):
+    pygame.font.init()  # All these runs need; the display and sound devices are never opened
+else:
+    pygame.init()
+    try:
+        pygame.mixer.init()  # Initialize sound mixer
+    except pygame.error as e:
+        print(f"Sound mixer unavailable: {e}", file=sys.stderr)
 
 # Screen dimensions
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Duck Shooter")
+screen = None  # Display surface, created by create_window() when running interactively
 
 # Create assets directory if it doesn't exist
-os.makedirs(os.path.join(os.path.dirname(__file__), "assets"), exist_ok=True)
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
+CACHE_DIR = os.path.join(ASSETS_DIR, "cache")  # Generated files, safe to delete
+os.makedirs(ASSETS_DIR, exist_ok=True)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -59,37 +90,228 @@ class PowerUpType(Enum):
     SLOW_MOTION = 2
     MULTI_SHOT = 3
 
-# Game variables
-score = 0
-high_scores = [0, 0, 0, 0, 0]  # Top 5 high scores
-current_weapon = WeaponType.GUN
+# Game variables (per-game state such as score and level lives in GameSession)
+high_score_store = None  # HighScoreStore, opened in main()
+high_scores = {}  # Difficulty -> top HIGH_SCORE_COUNT (score, level) rows, loaded on first use
 game_state = GameState.MENU
 clock = pygame.time.Clock()
 FPS = 60
-level = 1
-ducks_killed = 0
-ducks_needed_for_next_level = 10
-time_remaining = 60  # seconds
 difficulty = 1  # 1=easy, 2=medium, 3=hard
+PIXEL_PERFECT_HITS = True  # Only count hits on a duck's opaque pixels, not its whole bounding box
+COLLISION_ROW_HEIGHT = 64  # Height of the strips ducks are bucketed into for the collision broad phase
+COLLISION_ALL_PAIRS_LIMIT = 40000  # Up to this many projectile-duck pairs, test them all instead of using the broad phase
+DIRTY_RECT_RENDERING = True  # Only redraw and push the screen areas that changed
+DIRTY_RECT_MAX_ENTITIES = 200  # Above this many entities, redraw and flip the whole window
+PARALLAX_BACKGROUND = False  # Drift the cloud layer during play, repainting only its strip
+PARALLAX_CLOUD_SPEED = 12  # Cloud drift in pixels per second
+MENU_ANIMATION_FPS = 30  # Redraw rate of the animated menu duck
+IDLE_WAIT_TIMEOUT = 500  # Longest wait for input on static screens, in milliseconds
+TICK_TIME = 1 / FPS  # Simulation runs at a fixed FPS ticks per second regardless of the display rate
+MAX_RENDER_FPS = 240  # Cap on drawn frames per second
+MAX_CATCH_UP_TICKS = 5  # Most simulation ticks run for one drawn frame before dropping time
+MAX_FRAME_SKIP = 3  # Most consecutive draws skipped while catching up
+# Event types the game handles; everything else is dropped before it reaches the queue
+INPUT_EVENT_TYPES = [pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.VIDEOEXPOSE]
+CLICK_OFFSET_STEPS = 255  # Click times within a tick are truncated to 1/255 of a tick so replays reproduce them
+
+# Input recording and replay
+REPLAY_DIR = os.path.join(os.path.dirname(__file__), "replays")
+RECORD_REPLAYS = True  # Save every finished game's input log to REPLAY_DIR
+REPLAY_MAGIC = b"DSRP"
+REPLAY_VERSION = 4
+REPLAY_HEADER = "<4sBIBB"  # Magic, version, seed, difficulty, flags (bit 0: entity store, bit 1: pixel hits)
+# Per-record flags; ticks with no change are stored as a skip count on the next record
+REPLAY_MOUSE = 1
+REPLAY_CLICKS = 2
+REPLAY_WEAPON = 4
+REPLAY_END = 0x80  # Final record, followed by the score and state checksum
+
+# Session snapshots
+SNAPSHOT_MAGIC = b"DSSN"
+SNAPSHOT_VERSION = 4
+# Magic, version, difficulty, flags (bit 0: entity store, bit 1: game over, bit 2: pixel hits), seed
+SNAPSHOT_HEADER = "<4sBBBI"
+SNAPSHOT_SESSION = "<7i"  # Score, level, kills, kills needed, time remaining, game timer, power-up timer
+SNAPSHOT_STATS = "<3i4iI"  # Shots, hits, total kills, kills per DuckType, cleared level count (ticks follow)
+SNAPSHOT_RNG = "<625I?d"  # random.Random Mersenne Twister state and its cached gauss value
+SNAPSHOT_NUMPY_RNG = "<16s16s?I"  # PCG64 state, increment, has_uint32, uinteger
+SNAPSHOT_PLAYER = "<ddBddB"  # Crosshair, current weapon, multipliers, active power-up count
+SNAPSHOT_WEAPON = "<iii"  # Cooldown, max cooldown, ammo
+SNAPSHOT_ACTIVE_POWERUP = "<Bi"  # Type, ticks left
+SNAPSHOT_DUCK = "<B9dbbi"  # Type, position, previous position, speed, flap timer/speed/offset, facing, flap direction, health
+SNAPSHOT_PROJECTILE = "<B7di?"  # Weapon, position, previous position, velocity, angle, damage, multi-shot
+SNAPSHOT_POWERUP = "<B4di"  # Type, x, y, previous y, fall speed, duration
+SNAPSHOT_PROJECTILE_VIEW = "<Bd?"  # Weapon, angle, multi-shot; the rest is in the ProjectileStore arrays
+QUICK_RESUME_PATH = os.path.join(os.path.dirname(__file__), "quicksave.snap")
+QUICK_RESUME_INTERVAL = 5 * FPS  # Ticks between quick-resume saves
+REPLAY_CHECKPOINT_INTERVAL = 10 * FPS  # Ticks between replay snapshots used for seeking
+
+# Persistent high scores
+HIGH_SCORE_DB = os.path.join(os.path.dirname(__file__), "highscores.db")
+HIGH_SCORE_COUNT = 5  # Rows shown on the game over screen
+
+# Frame profiler
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+PROFILER_HISTORY = 240  # Frames kept for the graph and Chrome trace
+PROFILER_CAPTURE_FRAMES = 300  # Frames covered by a cProfile capture
+PROFILER_PHASES = ["events", "input", "player", "ducks", "projectiles", "powerups", "particles",
+                   "draw_background", "draw_entities", "draw_hud", "profiler", "present"]
+
+PROJECTILE_ORIGIN = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)  # Where every shot is launched from
+
+# Weapon stats: type -> (cooldown in ticks, damage, projectile speed, starting ammo; -1 means unlimited)
+WEAPON_STATS = {
+    WeaponType.GUN: (20, 2, 20, 30),
+    WeaponType.KNIFE: (15, 3, 12, 15),
+    WeaponType.STONE: (25, 1, 10, 20),
+    WeaponType.BOW: (40, 4, 18, 10),
+}
+WEAPON_SOUNDS = {
+    WeaponType.GUN: "gun_shoot",
+    WeaponType.KNIFE: "knife_throw",
+    WeaponType.STONE: "stone_throw",
+    WeaponType.BOW: "bow_shoot",
+}
+
+# Level progression
+GAME_TIME = 60  # Starting time in seconds
+LEVEL_TIME_BONUS = 30  # Seconds added on every level up
+KILLS_PER_LEVEL = 10  # Level n needs KILLS_PER_LEVEL * n kills
+DUCK_COUNT_BASE = 3  # Ducks on screen: base + per_level * (level - 1) + per_difficulty * difficulty
+DUCK_COUNT_PER_LEVEL = 1
+DUCK_COUNT_PER_DIFFICULTY = 1
+
+# Balance sweep parameters: name -> module setting; tables are addressed as weapon.<TYPE>.<field> and duck.<TYPE>.<field>
+BALANCE_SETTINGS = {
+    "game_time": "GAME_TIME",
+    "level_time_bonus": "LEVEL_TIME_BONUS",
+    "kills_per_level": "KILLS_PER_LEVEL",
+    "duck_count_base": "DUCK_COUNT_BASE",
+    "duck_count_per_level": "DUCK_COUNT_PER_LEVEL",
+    "duck_count_per_difficulty": "DUCK_COUNT_PER_DIFFICULTY",
+}
+WEAPON_STAT_FIELDS = ("max_cooldown", "damage", "projectile_speed", "ammo")
+DUCK_STAT_FIELDS = ("health", "score", "speed")
+BALANCE_CHUNK_GAMES = 25  # Games per worker task
+BALANCE_REPORT_PATH = "balance_report.json"
+
+# Duck stats: type -> (health, score value, speed multiplier)
+DUCK_STATS = {
+    DuckType.NORMAL: (5, 10, 1.0),
+    DuckType.FAST: (3, 15, 1.8),  # Lower health but move quicker
+    DuckType.ARMORED: (10, 20, 0.7),  # Higher health but move slower
+    DuckType.GOLDEN: (1, 50, 2.2),  # Very low health but fast and worth more points
+}
 
 # Load fonts
 font_large = pygame.font.SysFont('Arial', 48, bold=True)
 font_medium = pygame.font.SysFont('Arial', 32)
 font_small = pygame.font.SysFont('Arial', 24)
 
+# Rendered text surfaces: {(font, text, color, antialias): surface}, least recently used first
+text_cache = OrderedDict()
+TEXT_CACHE_SIZE = 256
+
 # Sound effects dictionary
 sounds = {}
 
+# Sound effect definitions: name -> (frequency, duration, volume)
+SOUND_SPECS = {
+    "gun_shoot": (440, 0.1, 0.5),  # A4 note
+    "knife_throw": (330, 0.2, 0.5),  # E4 note
+    "stone_throw": (220, 0.3, 0.5),  # A3 note
+    "bow_shoot": (587, 0.15, 0.5),  # D5 note
+    "duck_hit": (880, 0.05, 0.5),  # A5 note
+    "duck_die": (220, 0.5, 0.7),  # A3 note, longer
+    "powerup": (660, 0.2, 0.8),  # E5 note
+    "level_up": (880, 0.5, 0.8),  # A5 note, longer
+}
+SOUND_SAMPLE_RATE = 44100
+SOUND_ATTACK_TIME = 0.005  # seconds
+SOUND_RELEASE_TIME = 0.01  # seconds
+SOUND_DECAY_RATE = 3.0  # Exponential decay over the length of the sound
+SOUND_CACHE_VERSION = 1  # Bump when the synthesis code changes
+
+# Mixer channels reserved per group; sounds only ever play on their own group's channels
+SOUND_GROUPS = {
+    "weapons": 4,
+    "impacts": 6,
+    "ui": 2,
+}
+# Sound playback rules: name -> (group, max simultaneous voices, min retrigger interval in ms, priority)
+# A higher priority sound may cut off the lowest priority voice in its group when every channel is busy
+SOUND_RULES = {
+    "gun_shoot": ("weapons", 2, 40, 2),
+    "knife_throw": ("weapons", 2, 40, 2),
+    "stone_throw": ("weapons", 2, 40, 2),
+    "bow_shoot": ("weapons", 2, 40, 2),
+    "duck_hit": ("impacts", 3, 50, 1),
+    "duck_die": ("impacts", 3, 50, 2),
+    "powerup": ("ui", 1, 0, 3),
+    "level_up": ("ui", 1, 0, 4),
+}
+
+# Particle effects: name -> (count, min speed, max speed, min life, max life, gravity, drag, shape, colors)
+# Speeds are in pixels per tick, lives in ticks; gravity is added to the vertical speed and the speed is
+# multiplied by drag every tick. Effects without colors take them from the duck that emitted them
+PARTICLE_EFFECTS = {
+    "feathers": (8, 0.5, 2.5, 40, 70, 0.04, 0.95, "feather", ()),
+    "feather_burst": (24, 1.0, 4.0, 50, 90, 0.04, 0.95, "feather", ()),
+    "sparks": (14, 2.0, 6.0, 10, 22, 0.15, 0.9, "spark", ((255, 255, 255), (255, 240, 120), ORANGE)),
+    "coins": (40, 1.5, 5.5, 50, 80, 0.2, 0.98, "coin", (GOLD, (255, 235, 120), ORANGE)),
+}
+# Effects per duck type: DuckType -> (effect where a shot lands, effect where the duck dies)
+DUCK_PARTICLE_EFFECTS = {
+    DuckType.NORMAL: ("feathers", "feather_burst"),
+    DuckType.FAST: ("feathers", "feather_burst"),
+    DuckType.ARMORED: ("sparks", "feather_burst"),
+    DuckType.GOLDEN: ("feathers", "coins"),
+}
+PARTICLE_BUDGET = 32768  # Live particles; new ones overwrite the oldest beyond this
+PARTICLE_FADE_STEPS = 4  # Pre-baked transparency levels each particle fades through
+PARTICLE_COLORKEY = (255, 0, 255)  # Transparent background of particle sprites; no effect may use it
+
+# Duck sprite registry: {(DuckType, width, height): {direction: [frames]}}
+duck_sprites = {}
+DUCK_FLAP_FRAMES = 8  # Wing-flap frames baked per facing direction
+# Hit masks of the duck sprites, same layout as duck_sprites
+duck_masks = {}
+
+# Power-up images shared by every power-up: {PowerUpType: surface}
+powerup_images = {}
+
+# Other procedural sprites, drawn once and shared read-only: {(builder name, args): surface}
+baked_sprites = {}
+background_layers = None  # BackgroundLayers shared by every UI
+background_image = None  # background_layers flattened into one image
+
+# Rotated projectile sprites: {(WeaponType, angle bucket): (surface, center offset)}, least recently used first
+rotated_projectiles = OrderedDict()
+ROTATION_STEP = 2  # Degrees per rotation cache bucket
+ROTATION_CACHE_SIZE = 512
+
+# Render text through the cache so unchanged labels and values are only rasterized once
+def render_text(font, text, color, antialias=True):
+    key = (font, text, color, antialias)
+    surface = text_cache.get(key)
+    if surface is not None:
+        text_cache.move_to_end(key)
+        return surface
+    
+    surface = font.render(text, antialias, color)
+    text_cache[key] = surface
+    if len(text_cache) > TEXT_CACHE_SIZE:
+        text_cache.popitem(last=False)
+    return surface
+
 # Create programmatic assets
 def create_placeholder_image(width, height, color):
     surface = pygame.Surface((width, height), pygame.SRCALPHA)
     surface.fill(color)
     return surface
 
-# Create duck image
-def create_duck_image(duck_type, width, height):
-    surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    
+# Get duck body and head colors
+def get_duck_colors(duck_type):
     # Base duck color based on type
     if duck_type == DuckType.NORMAL:
         body_color = (139, 69, 19)  # Brown
@@ -103,6 +325,12 @@ def create_duck_image(duck_type, width, height):
     elif duck_type == DuckType.GOLDEN:
         body_color = GOLD
         head_color = ORANGE
+    return body_color, head_color
+
+# Create duck image
+def create_duck_image(duck_type, width, height):
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    body_color, head_color = get_duck_colors(duck_type)
     
     # Draw duck body (oval)
     pygame.draw.ellipse(surface, body_color, (0, height//4, width*3//4, height*2//3))
@@ -125,6 +353,64 @@ def create_duck_image(duck_type, width, height):
     
     return surface
 
+# Convert a surface to the display pixel format once a window exists
+def convert_surface(surface):
+    if pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+# Map a duck's flap timer to one of the pre-baked wing frames
+def get_duck_frame_index(flap_timer):
+    phase = (flap_timer % (2 * math.pi)) / (2 * math.pi)
+    return int(phase * DUCK_FLAP_FRAMES) % DUCK_FLAP_FRAMES
+
+# Get the shared wing-flap frames for a duck type and size
+# Returns {direction: [frame, ...]} where direction -1 is the flipped (leftward) sprite
+def get_duck_frames(duck_type, width, height):
+    key = (duck_type, width, height)
+    frames = duck_sprites.get(key)
+    if frames is not None:
+        return frames
+    
+    base_image = create_duck_image(duck_type, width, height)
+    body_color, _ = get_duck_colors(duck_type)
+    right_frames = []
+    left_frames = []
+    
+    for i in range(DUCK_FLAP_FRAMES):
+        # Sample the wing offset at the middle of each frame's phase window
+        flap_timer = (i + 0.5) / DUCK_FLAP_FRAMES * 2 * math.pi
+        wing_y_offset = height//2 + math.sin(flap_timer) * 5
+        frame = base_image.copy()
+        pygame.draw.ellipse(frame, body_color, (width//4, wing_y_offset, width//3, height//3))
+        right_frames.append(convert_surface(frame))
+        left_frames.append(convert_surface(pygame.transform.flip(frame, True, False)))
+    
+    frames = {1: right_frames, -1: left_frames}
+    duck_sprites[key] = frames
+    return frames
+
+# Get the shared hit masks matching get_duck_frames, built from the frames on first use
+def get_duck_masks(duck_type, width, height):
+    key = (duck_type, width, height)
+    masks = duck_masks.get(key)
+    if masks is None:
+        frames = get_duck_frames(duck_type, width, height)
+        masks = {direction: [pygame.mask.from_surface(frame) for frame in frames[direction]]
+                 for direction in frames}
+        duck_masks[key] = masks
+    return masks
+
+# Get a shared sprite drawn by builder(*args), drawing and converting it on first use
+# Callers must never draw onto the returned surface
+def get_baked_sprite(builder, *args):
+    key = (builder.__name__, args)
+    surface = baked_sprites.get(key)
+    if surface is None:
+        surface = convert_surface(builder(*args))
+        baked_sprites[key] = surface
+    return surface
+
 # Create crosshair image
 def create_crosshair_image(size):
     surface = pygame.Surface((size, size), pygame.SRCALPHA)
@@ -206,6 +492,22 @@ def create_projectile_image(weapon_type):
         pygame.draw.polygon(surface, (255, 255, 255), [(0, 5), (5, 3), (0, 3)])
         return surface
 
+# Get a projectile sprite rotated to the nearest cached angle, with the offset from its center to its corner
+def get_rotated_projectile(weapon, angle):
+    bucket = round(angle / ROTATION_STEP) % (360 // ROTATION_STEP)
+    key = (weapon.type, bucket)
+    entry = rotated_projectiles.get(key)
+    if entry is not None:
+        rotated_projectiles.move_to_end(key)
+        return entry
+    
+    image = convert_surface(pygame.transform.rotate(weapon.projectile_image, bucket * ROTATION_STEP))
+    entry = (image, (image.get_width() / 2, image.get_height() / 2))
+    rotated_projectiles[key] = entry
+    if len(rotated_projectiles) > ROTATION_CACHE_SIZE:
+        rotated_projectiles.popitem(last=False)
+    return entry
+
 # Create power-up images
 def create_powerup_image(powerup_type):
     surface = pygame.Surface((30, 30), pygame.SRCALPHA)
@@ -238,131 +540,443 @@ def create_powerup_image(powerup_type):
     
     return surface
 
-# Create background image
-def create_background_image():
-    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    
-    # Sky gradient
-    for y in range(SCREEN_HEIGHT - 100):
-        # Calculate color based on height (darker blue at top, lighter at bottom)
-        blue_val = min(255, 100 + int(y * 0.2))
-        surface.fill((100, 149, blue_val), (0, y, SCREEN_WIDTH, 1))
-    
-    # Ground
-    pygame.draw.rect(surface, GREEN, (0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100))
+# Get the shared image for a power-up type
+def get_powerup_image(powerup_type):
+    image = powerup_images.get(powerup_type)
+    if image is None:
+        image = convert_surface(create_powerup_image(powerup_type))
+        powerup_images[powerup_type] = image
+    return image
+
+# Sky gradient (darker blue at top, lighter at bottom) with the sun
+# The gradient is computed as one pixel column and stretched across the screen in a single scale
+def create_sky_image():
+    height = SCREEN_HEIGHT - 100
+    if numpy is not None:
+        column = numpy.empty((1, height, 3), dtype=numpy.uint8)
+        column[:, :, 0] = 100
+        column[:, :, 1] = 149
+        column[:, :, 2] = numpy.minimum(255, 100 + (numpy.arange(height) * 0.2).astype(int))
+        surface = pygame.transform.scale(pygame.surfarray.make_surface(column), (SCREEN_WIDTH, height))
+    else:
+        surface = pygame.Surface((SCREEN_WIDTH, height))
+        for y in range(height):
+            surface.fill((100, 149, min(255, 100 + int(y * 0.2))), (0, y, SCREEN_WIDTH, 1))
     
     # Sun
     pygame.draw.circle(surface, (255, 255, 200), (100, 100), 50)
+    return surface
+
+# Background scenery baked as separate layers: sky, ground and transparent cloud and tree strips
+# The strips only cover the rows their shapes can reach, so moving one repaints a band, not the screen
+class BackgroundLayers:
+    def __init__(self, rng=random):
+        self.sky = create_sky_image()
+        self.ground = pygame.Surface((SCREEN_WIDTH, 100))
+        self.ground.fill(GREEN)
+        
+        # Clouds: puffs around y 50-200, drawn wrapped so the strip tiles horizontally
+        self.cloud_band = pygame.Rect(0, 0, SCREEN_WIDTH, 280)
+        self.clouds = pygame.Surface(self.cloud_band.size, pygame.SRCALPHA)
+        puffs = []
+        for i in range(5):
+            x = rng.randint(0, SCREEN_WIDTH)
+            y = rng.randint(50, 200)
+            size = rng.randint(30, 80)
+            for j in range(5):
+                cloud_x = x + rng.randint(-size, size)
+                cloud_y = y + rng.randint(-size//2, size//2)
+                pygame.draw.circle(self.clouds, (240, 240, 240), (cloud_x, cloud_y - self.cloud_band.y), size//2)
+                puffs.append((cloud_x, cloud_y - self.cloud_band.y, size//2))
+        
+        # Trees standing on the ground line
+        self.tree_band = pygame.Rect(0, SCREEN_HEIGHT - 260, SCREEN_WIDTH, 160)
+        self.trees = pygame.Surface(self.tree_band.size, pygame.SRCALPHA)
+        for i in range(10):
+            x = rng.randint(0, SCREEN_WIDTH)
+            y = self.tree_band.height
+            trunk_height = rng.randint(30, 60)
+            trunk_width = trunk_height // 3
+            # Draw trunk
+            pygame.draw.rect(self.trees, (101, 67, 33), (x, y - trunk_height, trunk_width, trunk_height))
+            # Draw foliage
+            foliage_size = trunk_width * 3
+            pygame.draw.circle(self.trees, (0, 100, 0), (x + trunk_width//2, y - trunk_height - foliage_size//2),
+                               foliage_size)
+        
+        # A copy of the clouds where puffs crossing one screen edge reappear at the other, so it tiles when scrolling
+        self.wrapped_clouds = self.clouds.copy()
+        for cloud_x, cloud_y, radius in puffs:
+            for wrapped_x in (cloud_x - SCREEN_WIDTH, cloud_x + SCREEN_WIDTH):
+                pygame.draw.circle(self.wrapped_clouds, (240, 240, 240), (wrapped_x, cloud_y), radius)
     
-    # Clouds
-    for i in range(5):
-        x = random.randint(0, SCREEN_WIDTH)
-        y = random.randint(50, 200)
-        size = random.randint(30, 80)
-        for j in range(5):
-            cloud_x = x + random.randint(-size, size)
-            cloud_y = y + random.randint(-size//2, size//2)
-            pygame.draw.circle(surface, (240, 240, 240), (cloud_x, cloud_y), size//2)
-    
-    # Trees
-    for i in range(10):
-        x = random.randint(0, SCREEN_WIDTH)
-        y = SCREEN_HEIGHT - 100
-        trunk_height = random.randint(30, 60)
-        trunk_width = trunk_height // 3
-        # Draw trunk
-        pygame.draw.rect(surface, (101, 67, 33), (x, y - trunk_height, trunk_width, trunk_height))
-        # Draw foliage
-        foliage_size = trunk_width * 3
-        pygame.draw.circle(surface, (0, 100, 0), (x + trunk_width//2, y - trunk_height - foliage_size//2), foliage_size)
+    def convert(self):
+        if pygame.display.get_surface() is not None:
+            self.sky = self.sky.convert()
+            self.ground = self.ground.convert()
+            self.clouds = self.clouds.convert_alpha()
+            self.wrapped_clouds = self.wrapped_clouds.convert_alpha()
+            self.trees = self.trees.convert_alpha()
     
-    return surface
+    # Flatten every layer into one opaque image
+    def compose(self):
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        surface.blit(self.sky, (0, 0))
+        surface.blit(self.ground, (0, SCREEN_HEIGHT - 100))
+        surface.blit(self.clouds, self.cloud_band)
+        surface.blit(self.trees, self.tree_band)
+        return surface
+    
+    # Repaint the cloud strip of surface with the clouds scrolled left by offset pixels
+    def draw_clouds(self, surface, offset):
+        band = self.cloud_band
+        surface.blit(self.sky, band, band)
+        surface.blit(self.wrapped_clouds, (band.x - offset, band.y))
+        surface.blit(self.wrapped_clouds, (band.x - offset + SCREEN_WIDTH, band.y))
+        return band
+
+# Get the shared background layers, drawn once per process
+def get_background_layers():
+    global background_layers
+    if background_layers is None:
+        background_layers = BackgroundLayers()
+        background_layers.convert()
+    return background_layers
+
+def get_background_image():
+    global background_image
+    if background_image is None:
+        background_image = get_background_layers().compose()
+        if pygame.display.get_surface() is not None:
+            background_image = background_image.convert()
+    return background_image
+
+# Draw every procedural sprite up front so no frame, restart or new entity has to
+def bake_assets():
+    for duck_type in DuckType:
+        get_duck_frames(duck_type, 60, 40)
+        get_duck_masks(duck_type, 60, 40)
+    get_baked_sprite(create_duck_image, DuckType.NORMAL, 80, 60)  # Menu duck
+    for weapon_type in WeaponType:
+        get_baked_sprite(create_weapon_image, weapon_type)
+        get_baked_sprite(create_projectile_image, weapon_type)
+    get_baked_sprite(create_crosshair_image, 30)
+    for powerup_type in PowerUpType:
+        get_powerup_image(powerup_type)
+    get_background_image()
+
+# Synthesize a stereo tone with a short attack and a decay tail so it starts and ends without clicks
+def create_tone_samples(frequency, duration, volume=0.5):
+    n_samples = int(SOUND_SAMPLE_RATE * duration)
+    max_sample = 2**(16 - 1) - 1
+    t = numpy.arange(n_samples) / SOUND_SAMPLE_RATE
+    
+    envelope = numpy.exp(-SOUND_DECAY_RATE * t / duration)
+    attack = min(n_samples, int(SOUND_SAMPLE_RATE * SOUND_ATTACK_TIME))
+    release = min(n_samples, int(SOUND_SAMPLE_RATE * SOUND_RELEASE_TIME))
+    envelope[:attack] *= numpy.linspace(0.0, 1.0, attack, endpoint=False)
+    envelope[n_samples - release:] *= numpy.linspace(1.0, 0.0, release)
+    
+    mono = (max_sample * volume * envelope * numpy.sin(2 * math.pi * frequency * t)).astype(numpy.int16)
+    return numpy.column_stack((mono, mono))
+
+# Directory holding the rendered sound effects for the current sound definitions
+def get_sound_cache_dir():
+    spec_hash = zlib.crc32(repr((sorted(SOUND_SPECS.items()), SOUND_SAMPLE_RATE, SOUND_ATTACK_TIME,
+                                 SOUND_RELEASE_TIME, SOUND_DECAY_RATE)).encode())
+    return os.path.join(CACHE_DIR, f"sounds_v{SOUND_CACHE_VERSION}_{spec_hash:08x}")
+
+# Write 16-bit stereo PCM to a WAV file, replacing any previous file atomically
+def write_wav_file(path, samples):
+    temp_path = path + ".tmp"
+    with wave.open(temp_path, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SOUND_SAMPLE_RATE)
+        wav_file.writeframes(samples.tobytes())
+    os.replace(temp_path, path)
 
 # Create sound effects
 def create_sound_effects():
     global sounds
     
-    try:
-        import numpy
-        
-        # Create a simple beep sound for shooting
-        def create_beep_sound(frequency, duration, volume=0.5):
-            sample_rate = 44100
-            n_samples = int(sample_rate * duration)
-            buf = numpy.zeros((n_samples, 2), dtype=numpy.int16)
-            max_sample = 2**(16 - 1) - 1
+    cache_dir = get_sound_cache_dir()
+    for sound_name, (frequency, duration, volume) in SOUND_SPECS.items():
+        path = os.path.join(cache_dir, sound_name + ".wav")
+        
+        # Load the previously rendered sound if it exists
+        if os.path.exists(path):
+            try:
+                sounds[sound_name] = pygame.mixer.Sound(path)
+                continue
+            except pygame.error:
+                pass  # Corrupt cache file, render it again
+        
+        if numpy is None:
+            print("NumPy not available, sound effects disabled")
+            # Create empty sounds as fallback
+            empty_sound = pygame.mixer.Sound(buffer=bytearray(44100))  # Short silence
+            for name in SOUND_SPECS:
+                sounds.setdefault(name, empty_sound)
+            return
+        
+        samples = create_tone_samples(frequency, duration, volume)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_wav_file(path, samples)
+            sounds[sound_name] = pygame.mixer.Sound(path)
+        except OSError:
+            # Cache not writable, use the samples directly
+            sounds[sound_name] = pygame.mixer.Sound(buffer=samples)
+
+# Voice manager between the game and pygame.mixer
+# play() only queues a request; flush() starts at most one voice per queued sound, so the cost of a tick's
+# sounds stays flat however many ducks die in it
+class AudioMixer:
+    def __init__(self):
+        self.enabled = False  # Until setup(); headless runs never play anything
+        self.pending = {}  # Sound name -> requests this tick
+        self.groups = {}  # Group name -> [Channel]
+        self.voices = {}  # Channel -> (sound name, priority)
+        self.last_played = {}  # Sound name -> pygame ticks when it last started
+    
+    # Reserve the channel groups; call once the mixer and sound effects are loaded
+    def setup(self):
+        if pygame.mixer.get_init() is None:
+            return
+        total = sum(SOUND_GROUPS.values())
+        pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)  # Keep Sound.play() from grabbing our channels
+        channel_id = 0
+        for group, count in SOUND_GROUPS.items():
+            self.groups[group] = [pygame.mixer.Channel(channel_id + i) for i in range(count)]
+            channel_id += count
+        self.enabled = True
+    
+    def play(self, sound_name):
+        if self.enabled:
+            self.pending[sound_name] = self.pending.get(sound_name, 0) + 1
+    
+    # Start this tick's queued sounds, most important first
+    def flush(self):
+        if not self.pending:
+            return
+        now = pygame.time.get_ticks()
+        requests = sorted(self.pending, key=lambda name: SOUND_RULES[name][3], reverse=True)
+        self.pending.clear()
+        for sound_name in requests:
+            sound = sounds.get(sound_name)
+            if sound is None:
+                continue
+            group, max_voices, retrigger_interval, priority = SOUND_RULES[sound_name]
+            last = self.last_played.get(sound_name)
+            if last is not None and now - last < retrigger_interval:
+                continue
             
-            for s in range(n_samples):
-                t = float(s) / sample_rate
-                buf[s][0] = int(max_sample * volume * math.sin(2 * math.pi * frequency * t))
-                buf[s][1] = int(max_sample * volume * math.sin(2 * math.pi * frequency * t))
-                
-            return pygame.mixer.Sound(buffer=buf)
-        
-        # Create sound effects
-        sounds["gun_shoot"] = create_beep_sound(440, 0.1)  # A4 note
-        sounds["knife_throw"] = create_beep_sound(330, 0.2)  # E4 note
-        sounds["stone_throw"] = create_beep_sound(220, 0.3)  # A3 note
-        sounds["bow_shoot"] = create_beep_sound(587, 0.15)  # D5 note
-        sounds["duck_hit"] = create_beep_sound(880, 0.05)  # A5 note
-        sounds["duck_die"] = create_beep_sound(220, 0.5, 0.7)  # A3 note, longer
-        sounds["powerup"] = create_beep_sound(660, 0.2, 0.8)  # E5 note
-        sounds["level_up"] = create_beep_sound(880, 0.5, 0.8)  # A5 note, longer
-        
-    except ImportError:
-        print("NumPy not available, sound effects disabled")
-        # Create empty sounds as fallback
-        empty_sound = pygame.mixer.Sound(buffer=bytearray(44100))  # 1 second of silence
-        for sound_name in ["gun_shoot", "knife_throw", "stone_throw", "bow_shoot", 
-                          "duck_hit", "duck_die", "powerup", "level_up"]:
-            sounds[sound_name] = empty_sound
+            channels = self.groups[group]
+            playing = [channel for channel in channels if channel.get_busy()]
+            same_sound = [channel for channel in playing if self.voices[channel][0] == sound_name]
+            if len(same_sound) >= max_voices:
+                channel = same_sound[0]  # Restart the oldest voice of this sound rather than stacking another
+            elif len(playing) < len(channels):
+                channel = next(channel for channel in channels if not channel.get_busy())
+            else:
+                # Steal the lowest priority voice, if it's less important than this sound
+                channel = min(playing, key=lambda channel: self.voices[channel][1])
+                if self.voices[channel][1] >= priority:
+                    continue
+            
+            channel.play(sound)
+            # Keep channels in start order so the oldest voices come first
+            channels.remove(channel)
+            channels.append(channel)
+            self.voices[channel] = (sound_name, priority)
+            self.last_played[sound_name] = now
+    
+    def stop(self):
+        self.pending.clear()
+        for channels in self.groups.values():
+            for channel in channels:
+                channel.stop()
+
+audio = AudioMixer()
+
+# Draw one opaque, color-keyed particle sprite of the given shape and color
+def create_particle_image(shape, color):
+    size = {"feather": (8, 4), "spark": (4, 4), "coin": (8, 8)}[shape]
+    surface = pygame.Surface(size)
+    surface.fill(PARTICLE_COLORKEY)
+    surface.set_colorkey(PARTICLE_COLORKEY)
+    if shape == "feather":
+        pygame.draw.ellipse(surface, color, (0, 0, 8, 4))
+    elif shape == "spark":
+        surface.fill(color)
+    elif shape == "coin":
+        pygame.draw.circle(surface, color, (4, 4), 4)
+        pygame.draw.circle(surface, WHITE, (3, 3), 1)  # Glint
+    return surface
+
+# Visual-only particles in NumPy ring buffers, moved and drawn in whole-array batches
+# Effects are emitted by the simulation but never feed back into it, so replays and snapshots ignore them
+class ParticleSystem:
+    fields = {
+        "x": "f4",
+        "y": "f4",
+        "vx": "f4",
+        "vy": "f4",
+        "age": "i2",
+        "life": "i2",
+        "gravity": "f4",
+        "drag": "f4",
+        "color": "i4",  # First of the particle's pre-baked fade sprites
+    }
+    
+    def __init__(self, capacity=PARTICLE_BUDGET):
+        self.enabled = False  # Until setup(); headless runs never emit anything
+        self.capacity = capacity
+        self.sprites = []  # Fade sprites of every (shape, color) used so far, PARTICLE_FADE_STEPS each
+        self.sprite_offsets = None  # Half size of each sprite, to center it
+        self.sprite_indices = {}  # (shape, color) -> index of its first sprite
+        self.clear()
+    
+    # Allocate the buffers and bake every effect's sprites; without NumPy there are no particles
+    def setup(self):
+        if numpy is None or self.enabled:
+            return
+        for field, dtype in self.fields.items():
+            setattr(self, field, numpy.zeros(self.capacity, dtype=dtype))
+        self.rng = numpy.random.default_rng()
+        self.sprite_offsets = numpy.zeros((0, 2), dtype="f4")
+        for duck_type, effects in DUCK_PARTICLE_EFFECTS.items():
+            for effect in effects:
+                shape, colors = PARTICLE_EFFECTS[effect][7:]
+                for color in colors or get_duck_colors(duck_type):
+                    self.get_sprite_index(shape, color)
+        self.enabled = True
+    
+    def clear(self):
+        self.pending = []  # (effect, x, y, colors) bursts emitted since the last update()
+        self.head = 0  # Next slot to write
+        self.used = 0  # Slots [0, used) have held a particle since the buffers were last empty
+        self.ticks_left = 0  # Until the longest-lived particle expires
+    
+    def get_sprite_index(self, shape, color):
+        key = (shape, color)
+        index = self.sprite_indices.get(key)
+        if index is None:
+            index = len(self.sprites)
+            # Opaque particles blit color-keyed, about twice as fast as per-pixel alpha; fading ones
+            # get the alpha baked into their pixels, since surface alpha on top of a color key is slower still
+            image = create_particle_image(shape, color)
+            self.sprites.append(image.convert() if pygame.display.get_surface() is not None else image)
+            for step in range(1, PARTICLE_FADE_STEPS):
+                sprite = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+                sprite.blit(image, (0, 0))
+                alpha = 255 * (PARTICLE_FADE_STEPS - step) // PARTICLE_FADE_STEPS
+                sprite.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+                self.sprites.append(convert_surface(sprite))
+            offsets = [(sprite.get_width() / 2, sprite.get_height() / 2) for sprite in self.sprites[index:]]
+            self.sprite_offsets = numpy.concatenate((self.sprite_offsets, numpy.array(offsets, dtype="f4")))
+            self.sprite_indices[key] = index
+        return index
+    
+    # Queue a burst of one PARTICLE_EFFECTS effect around (x, y); update() spawns the tick's bursts together
+    def emit(self, effect, x, y, colors=()):
+        if self.enabled:
+            self.pending.append((effect, x, y, colors))
+    
+    # Write every queued burst into the ring buffers in one batch, overwriting the oldest particles
+    def spawn_pending(self):
+        pending = self.pending
+        self.pending = []
+        effects = [PARTICLE_EFFECTS[effect] for effect, x, y, colors in pending]
+        counts = [effect[0] for effect in effects]
+        # One column per burst, repeated into one column per particle
+        bursts = numpy.array([(burst[1], burst[2], *effect[1:7]) for effect, burst in zip(effects, pending)])
+        x, y, min_speed, max_speed, min_life, max_life, gravity, drag = numpy.repeat(bursts.T, counts, axis=1)
+        
+        # Each particle picks one of its burst's colors
+        palettes = [[self.get_sprite_index(effect[7], color) for color in effect[8] or burst[3]]
+                    for effect, burst in zip(effects, pending)]
+        palette_sizes = numpy.repeat([len(palette) for palette in palettes], counts)
+        palette_starts = numpy.repeat(numpy.cumsum([0] + [len(palette) for palette in palettes[:-1]]), counts)
+        color = numpy.array([index for palette in palettes for index in palette])[
+            palette_starts + (self.rng.random(len(x)) * palette_sizes).astype(int)]
+        
+        # More than the whole budget at once: only the newest particles survive
+        total = min(len(x), self.capacity)
+        skip = len(x) - total
+        rng = self.rng
+        slots = (self.head + numpy.arange(total)) % self.capacity
+        self.head = (self.head + total) % self.capacity
+        self.used = min(self.used + total, self.capacity)
+        self.ticks_left = max(self.ticks_left, int(max_life.max()))
+        
+        angle = rng.uniform(0, 2 * math.pi, total)
+        speed = min_speed[skip:] + (max_speed[skip:] - min_speed[skip:]) * rng.random(total)
+        self.x[slots] = x[skip:]
+        self.y[slots] = y[skip:]
+        self.vx[slots] = numpy.cos(angle) * speed
+        self.vy[slots] = numpy.sin(angle) * speed
+        self.age[slots] = 0
+        self.life[slots] = min_life[skip:] + (max_life[skip:] - min_life[skip:] + 1) * rng.random(total)
+        self.gravity[slots] = gravity[skip:]
+        self.drag[slots] = drag[skip:]
+        self.color[slots] = color[skip:]
+    
+    # Spawn the queued bursts and advance every particle by one tick
+    def update(self):
+        if self.pending:
+            self.spawn_pending()
+        n = self.used
+        if n == 0:
+            return
+        self.ticks_left -= 1
+        if self.ticks_left <= 0:
+            self.clear()  # Everything expired; start filling from the front again
+            return
+        vx = self.vx[:n]
+        vy = self.vy[:n]
+        drag = self.drag[:n]
+        vx *= drag
+        vy *= drag
+        vy += self.gravity[:n]
+        self.x[:n] += vx
+        self.y[:n] += vy
+        self.age[:n] += 1
+    
+    # Draw the live particles, alpha of the way from their previous position
+    # Returns the drawn rects, or an empty list when track is off (building thousands of rects is not free)
+    def draw(self, surface, alpha=1.0, track=True):
+        n = self.used
+        if n == 0:
+            return []
+        age = self.age[:n]
+        life = self.life[:n]
+        live = numpy.flatnonzero(age < life)
+        if not len(live):
+            return []
+        sprite = self.color[live] + age[live] * PARTICLE_FADE_STEPS // life[live]
+        offsets = self.sprite_offsets[sprite]
+        back = 1.0 - alpha
+        x = self.x[live] - self.vx[live] * back - offsets[:, 0]
+        y = self.y[live] - self.vy[live] * back - offsets[:, 1]
+        sprites = self.sprites
+        rects = surface.blits(zip(map(sprites.__getitem__, sprite.tolist()), zip(x.tolist(), y.tolist())),
+                              doreturn=track)
+        return rects if track else []
+
+particles = ParticleSystem()
 
 # Weapon class
 class Weapon:
     def __init__(self, weapon_type):
         self.type = weapon_type
         self.cooldown = 0
-        self.max_cooldown = 30  # Default cooldown frames
-        self.damage = 1  # Default damage
-        self.projectile_speed = 15  # Default projectile speed
-        self.image = None
-        self.projectile_image = None
-        self.ammo = -1  # -1 means unlimited ammo
-        self.sound = None
-        
-        # Set weapon-specific properties
-        if weapon_type == WeaponType.GUN:
-            self.max_cooldown = 20
-            self.damage = 2
-            self.projectile_speed = 20
-            self.image = create_weapon_image(weapon_type)
-            self.projectile_image = create_projectile_image(weapon_type)
-            self.ammo = 30
-            self.sound = sounds.get("gun_shoot")
-        elif weapon_type == WeaponType.KNIFE:
-            self.max_cooldown = 15
-            self.damage = 3
-            self.projectile_speed = 12
-            self.image = create_weapon_image(weapon_type)
-            self.projectile_image = create_projectile_image(weapon_type)
-            self.ammo = 15
-            self.sound = sounds.get("knife_throw")
-        elif weapon_type == WeaponType.STONE:
-            self.max_cooldown = 25
-            self.damage = 1
-            self.projectile_speed = 10
-            self.image = create_weapon_image(weapon_type)
-            self.projectile_image = create_projectile_image(weapon_type)
-            self.ammo = 20
-            self.sound = sounds.get("stone_throw")
-        elif weapon_type == WeaponType.BOW:
-            self.max_cooldown = 40
-            self.damage = 4
-            self.projectile_speed = 18
-            self.image = create_weapon_image(weapon_type)
-            self.projectile_image = create_projectile_image(weapon_type)
-            self.ammo = 10
-            self.sound = sounds.get("bow_shoot")
+        self.max_cooldown, self.damage, self.projectile_speed, self.ammo = WEAPON_STATS[weapon_type]
+        self.image = get_baked_sprite(create_weapon_image, weapon_type)
+        self.projectile_image = get_baked_sprite(create_projectile_image, weapon_type)
+        self.sound = WEAPON_SOUNDS[weapon_type]
     
     def update(self):
         if self.cooldown > 0:
@@ -376,22 +990,26 @@ class Weapon:
             self.cooldown = self.max_cooldown
             if self.ammo > 0:
                 self.ammo -= 1
-            if self.sound:
-                self.sound.play()
+            audio.play(self.sound)
             return True
         return False
 
 # Projectile class
 class Projectile:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "weapon", "speed", "damage", "image", "width", "height",
+                 "dx", "dy", "angle", "rotated_image", "draw_offset", "is_multi_shot")
+    
     def __init__(self, x, y, target_x, target_y, weapon):
+        self.setup(x, y, target_x, target_y, weapon)
+    
+    # (Re)launch this projectile; pooled projectiles are recycled through here
+    def setup(self, x, y, target_x, target_y, weapon):
         self.x = x
         self.y = y
-        self.weapon = weapon
-        self.speed = weapon.projectile_speed
+        self.prev_x = x  # Position at the start of the last tick, for interpolated drawing
+        self.prev_y = y
+        self.set_weapon(weapon)
         self.damage = weapon.damage
-        self.image = weapon.projectile_image
-        self.width = self.image.get_width()
-        self.height = self.image.get_height()
         
         # Calculate direction vector
         dx = target_x - x
@@ -402,18 +1020,30 @@ class Projectile:
         
         # Calculate rotation angle for the projectile image
         self.angle = math.degrees(math.atan2(-dy, dx))
+        self.rotated_image, self.draw_offset = get_rotated_projectile(weapon, self.angle)
         
         # For multi-shot power-up
         self.is_multi_shot = False
     
+    def set_weapon(self, weapon):
+        self.weapon = weapon
+        self.speed = weapon.projectile_speed
+        self.image = weapon.projectile_image
+        self.width = self.image.get_width()
+        self.height = self.image.get_height()
+    
     def update(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.x += self.dx
         self.y += self.dy
     
-    def draw(self, surface):
-        rotated_image = pygame.transform.rotate(self.image, self.angle)
-        rect = rotated_image.get_rect(center=(self.x, self.y))
-        surface.blit(rotated_image, rect)
+    # alpha is how far rendering is between the previous tick and the current one
+    def draw(self, surface, alpha=1.0):
+        offset_x, offset_y = self.draw_offset
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return surface.blit(self.rotated_image, (x - offset_x, y - offset_y))
     
     def is_out_of_bounds(self):
         return (self.x < 0 or self.x > SCREEN_WIDTH or 
@@ -424,47 +1054,54 @@ class Projectile:
 
 # Duck class
 class Duck:
-    def __init__(self, duck_type=DuckType.NORMAL):
-        self.duck_type = duck_type
-        self.width = 60
-        self.height = 40
-        self.image = create_duck_image(duck_type, self.width, self.height)
-        self.hit_sound = sounds.get("duck_hit")
-        self.die_sound = sounds.get("duck_die")
+    __slots__ = ("duck_type", "width", "height", "frames", "masks", "image", "hit_sound", "die_sound",
+                 "health", "score_value", "speed_multiplier", "direction", "x", "y", "prev_x", "prev_y",
+                 "speed_x", "speed_y", "flap_timer", "flap_direction", "flap_speed", "flap_offset", "index",
+                 "rng")
+    
+    def __init__(self, duck_type=DuckType.NORMAL, rng=random):
+        self.index = -1  # Position in the owning duck list
+        self.setup(duck_type, rng)
+    
+    # (Re)initialize this duck as a fresh duck of the given type; pooled ducks are recycled through here
+    # rng is the owning session's random.Random, so respawns are reproducible from its seed
+    def setup(self, duck_type, rng=random):
+        self.set_type(duck_type, rng)
         
         # Set duck-specific properties
-        if duck_type == DuckType.NORMAL:
-            self.health = 5
-            self.score_value = 10
-            self.speed_multiplier = 1.0
-        elif duck_type == DuckType.FAST:
-            self.health = 3
-            self.score_value = 15
-            self.speed_multiplier = 1.8
-        elif duck_type == DuckType.ARMORED:
-            self.health = 10
-            self.score_value = 20
-            self.speed_multiplier = 0.7
-        elif duck_type == DuckType.GOLDEN:
-            self.health = 1
-            self.score_value = 50
-            self.speed_multiplier = 2.2
+        self.health, self.score_value, self.speed_multiplier = DUCK_STATS[duck_type]
             
         self.reset()
     
+    # Size, sprites and sounds for a duck type
+    def set_type(self, duck_type, rng=random):
+        self.duck_type = duck_type
+        self.rng = rng
+        self.width = 60
+        self.height = 40
+        self.frames = get_duck_frames(duck_type, self.width, self.height)
+        self.masks = get_duck_masks(duck_type, self.width, self.height)
+        self.image = self.frames[1][0]
+        self.hit_sound = "duck_hit"
+        self.die_sound = "duck_die"
+    
     def reset(self):
         # Start from either left or right side
-        self.direction = random.choice([-1, 1])  # -1 for left to right, 1 for right to left
+        self.direction = self.rng.choice([-1, 1])  # -1 for left to right, 1 for right to left
         
         if self.direction == -1:
             self.x = SCREEN_WIDTH + self.width
         else:
             self.x = -self.width
             
-        self.y = random.randint(100, SCREEN_HEIGHT - 200)
-        base_speed = random.uniform(2, 5)
+        self.y = self.rng.randint(100, SCREEN_HEIGHT - 200)
+        base_speed = self.rng.uniform(2, 5)
         self.speed_x = base_speed * self.direction * self.speed_multiplier
-        self.speed_y = random.uniform(-1, 1) * self.speed_multiplier
+        self.speed_y = self.rng.uniform(-1, 1) * self.speed_multiplier
+        
+        # Don't interpolate from the old position after respawning
+        self.prev_x = self.x
+        self.prev_y = self.y
         
         # Animation variables
         self.flap_timer = 0
@@ -473,6 +1110,8 @@ class Duck:
         self.flap_offset = 0
     
     def update(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.x += self.speed_x
         self.y += self.speed_y
         
@@ -489,34 +1128,25 @@ class Duck:
         self.flap_timer += self.flap_speed
         self.flap_offset = math.sin(self.flap_timer) * 5
     
-    def draw(self, surface):
-        # Create a copy of the image for animation
-        image_copy = self.image.copy()
-        
-        # Draw wing with flapping animation
-        wing_y_offset = self.height//2 + self.flap_offset
-        pygame.draw.ellipse(image_copy, (139, 69, 19) if self.duck_type == DuckType.NORMAL else 
-                           (0, 0, 255) if self.duck_type == DuckType.FAST else
-                           (169, 169, 169) if self.duck_type == DuckType.ARMORED else
-                           GOLD, 
-                           (self.width//4, wing_y_offset, self.width//3, self.height//3))
-        
-        # Flip the image based on direction
-        if self.direction == -1:
-            flipped_image = pygame.transform.flip(image_copy, True, False)
-            surface.blit(flipped_image, (self.x, self.y))
-        else:
-            surface.blit(image_copy, (self.x, self.y))
+    # alpha is how far rendering is between the previous tick and the current one
+    def draw(self, surface, alpha=1.0):
+        # Pick the pre-baked frame for the current wing position and facing
+        frame = get_duck_frame_index(self.flap_timer)
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return surface.blit(self.frames[self.direction][frame], (x, y))
+    
+    # Hit mask of the frame currently shown
+    def get_mask(self):
+        return self.masks[self.direction][get_duck_frame_index(self.flap_timer)]
     
     def hit(self, damage):
         self.health -= damage
         if self.health <= 0:
-            if self.die_sound:
-                self.die_sound.play()
+            audio.play(self.die_sound)
             return True
         else:
-            if self.hit_sound:
-                self.hit_sound.play()
+            audio.play(self.hit_sound)
             return False
     
     def get_rect(self):
@@ -524,22 +1154,30 @@ class Duck:
 
 # PowerUp class
 class PowerUp:
+    __slots__ = ("x", "y", "prev_y", "type", "width", "height", "image", "speed_y", "active_time", "sound")
+    
     def __init__(self, x, y, powerup_type):
+        self.setup(x, y, powerup_type)
+    
+    # (Re)spawn this power-up; pooled power-ups are recycled through here
+    def setup(self, x, y, powerup_type):
         self.x = x
         self.y = y
+        self.prev_y = y  # Position at the start of the last tick, for interpolated drawing
         self.type = powerup_type
         self.width = 30
         self.height = 30
-        self.image = create_powerup_image(powerup_type)
+        self.image = get_powerup_image(powerup_type)
         self.speed_y = 2
         self.active_time = 10 * FPS  # 10 seconds
-        self.sound = sounds.get("powerup")
+        self.sound = "powerup"
     
     def update(self):
+        self.prev_y = self.y
         self.y += self.speed_y
     
-    def draw(self, surface):
-        surface.blit(self.image, (self.x, self.y))
+    def draw(self, surface, alpha=1.0):
+        return surface.blit(self.image, (self.x, self.prev_y + (self.y - self.prev_y) * alpha))
     
     def is_out_of_bounds(self):
         return self.y > SCREEN_HEIGHT
@@ -548,17 +1186,297 @@ class PowerUp:
         return pygame.Rect(self.x, self.y, self.width, self.height)
     
     def activate(self):
-        if self.sound:
-            self.sound.play()
+        audio.play(self.sound)
         return self.type, self.active_time
 
+# Property that reads and writes one slot of an entity store array
+def store_property(field, cast=float):
+    def getter(self):
+        return cast(getattr(self.store, field)[self.index])
+    
+    def setter(self, value):
+        getattr(self.store, field)[self.index] = value
+    
+    return property(getter, setter)
+
+# Struct-of-arrays storage shared by DuckStore and ProjectileStore
+# Entities are kept packed in slots [0, count); removal swaps the last entity into the hole
+class EntityStore:
+    fields = {}  # {field name: numpy dtype}; little-endian, so the arrays can be written to snapshots as-is
+    
+    def __init__(self, capacity=256):
+        if numpy is None:
+            raise RuntimeError("The entity store requires NumPy")
+        self.count = 0
+        self.capacity = capacity
+        self.views = []  # Entity objects in slot order
+        for field, dtype in self.fields.items():
+            setattr(self, field, numpy.zeros(capacity, dtype=dtype))
+    
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        while self.capacity < capacity:
+            self.capacity *= 2
+        for field in self.fields:
+            old = getattr(self, field)
+            new = numpy.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, field, new)
+    
+    def allocate(self):
+        self.reserve(self.count + 1)
+        self.count += 1
+        return self.count - 1
+    
+    def remove(self, view):
+        index = view.index
+        last = self.count - 1
+        if index != last:
+            for field in self.fields:
+                array = getattr(self, field)
+                array[index] = array[last]
+            moved = self.views[last]
+            moved.index = index
+            self.views[index] = moved
+        self.views.pop()
+        self.count = last
+        view.index = -1
+    
+    def clear(self):
+        for view in self.views:
+            view.index = -1
+        self.views.clear()
+        self.count = 0
+    
+    # Bytes save_fields() writes per entity
+    @classmethod
+    def get_entity_size(cls):
+        return sum(numpy.dtype(dtype).itemsize for dtype in cls.fields.values())
+    
+    # Raw bytes of every field for the live entities, one field after another
+    def save_fields(self):
+        return b"".join(getattr(self, field)[:self.count].tobytes() for field in self.fields)
+    
+    # Replace the contents with count entities read from save_fields() bytes at offset
+    # The views are left to the caller to rebuild; returns the offset just past the fields
+    def load_fields(self, data, offset, count):
+        self.reserve(count)
+        for field, dtype in self.fields.items():
+            values = numpy.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            getattr(self, field)[:count] = values
+            offset += values.nbytes
+        self.count = count
+        return offset
+
+# Array-backed duck population updated with whole-array operations
+class DuckStore(EntityStore):
+    fields = {
+        "x": "<f8",
+        "y": "<f8",
+        "prev_x": "<f8",
+        "prev_y": "<f8",
+        "speed_x": "<f8",
+        "speed_y": "<f8",
+        "speed_multiplier": "<f8",
+        "flap_timer": "<f8",
+        "direction": "i1",
+        "health": "<i4",
+        "duck_type": "i1",
+    }
+    
+    def __init__(self, capacity=256, seed=None):
+        super().__init__(capacity)
+        self.rng = numpy.random.default_rng(seed)
+        self.width = 60
+        self.height = 40
+    
+    def add(self, duck_type):
+        index = self.allocate()
+        self.duck_type[index] = duck_type.value
+        view = DuckView(self, index, duck_type)
+        self.views.append(view)
+        return view
+    
+    # Match the views to the ducks loaded by load_fields without respawning them
+    # Existing views are kept for the slots they already point at and only re-typed where the type changed
+    def attach_views(self):
+        views = self.views
+        for view in views[self.count:]:
+            view.index = -1
+        del views[self.count:]
+        duck_types = {duck_type.value: duck_type for duck_type in DuckType}
+        for index, value in enumerate(self.duck_type[:self.count].tolist()):
+            duck_type = duck_types[value]
+            if index == len(views):
+                views.append(DuckView(self, index, duck_type, respawn=False))
+            elif views[index].duck_type is not duck_type:
+                views[index].set_type(duck_type)
+                views[index].score_value = DUCK_STATS[duck_type][1]
+    
+    # Send the ducks at indices back to a random screen edge, like Duck.reset
+    def respawn(self, indices):
+        n = len(indices)
+        if n == 0:
+            return
+        rng = self.rng
+        direction = rng.choice(numpy.array([-1, 1], dtype=numpy.int8), n)
+        multiplier = self.speed_multiplier[indices]
+        self.direction[indices] = direction
+        self.x[indices] = numpy.where(direction == -1, SCREEN_WIDTH + self.width, -self.width)
+        self.y[indices] = rng.integers(100, SCREEN_HEIGHT - 200, n, endpoint=True)
+        self.speed_x[indices] = rng.uniform(2, 5, n) * direction * multiplier
+        self.speed_y[indices] = rng.uniform(-1, 1, n) * multiplier
+        self.prev_x[indices] = self.x[indices]
+        self.prev_y[indices] = self.y[indices]
+        self.flap_timer[indices] = 0
+    
+    def update(self):
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        speed_y = self.speed_y[:n]
+        direction = self.direction[:n]
+        
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        x += self.speed_x[:n]
+        y += speed_y
+        
+        # Bounce off top and bottom edges
+        bounce = (y <= 50) | (y >= SCREEN_HEIGHT - 150)
+        speed_y[bounce] *= -1
+        
+        # Respawn ducks that have gone off screen
+        off_screen = ((direction == -1) & (x < -self.width)) | ((direction == 1) & (x > SCREEN_WIDTH + self.width))
+        self.respawn(numpy.flatnonzero(off_screen))
+        
+        # Update wing flapping animation
+        self.flap_timer[:n] += 0.2
+    
+    def draw(self, surface, alpha=1.0):
+        n = self.count
+        frame_indices = ((self.flap_timer[:n] % (2 * math.pi)) / (2 * math.pi) * DUCK_FLAP_FRAMES).astype(int)
+        frame_indices %= DUCK_FLAP_FRAMES
+        prev_x = self.prev_x[:n]
+        prev_y = self.prev_y[:n]
+        x = prev_x + (self.x[:n] - prev_x) * alpha
+        y = prev_y + (self.y[:n] - prev_y) * alpha
+        positions = zip(x.tolist(), y.tolist())
+        surface.blits([(view.frames[direction][frame], position) for view, direction, frame, position in
+                       zip(self.views, self.direction[:n].tolist(), frame_indices.tolist(), positions)],
+                      doreturn=False)
+
+# Duck whose position, velocity, health and animation state live in a DuckStore
+class DuckView(Duck):
+    __slots__ = ("store",)
+    
+    x = store_property("x")
+    y = store_property("y")
+    prev_x = store_property("prev_x")
+    prev_y = store_property("prev_y")
+    speed_x = store_property("speed_x")
+    speed_y = store_property("speed_y")
+    speed_multiplier = store_property("speed_multiplier")
+    flap_timer = store_property("flap_timer")
+    direction = store_property("direction", int)
+    health = store_property("health", int)
+    
+    # With respawn=False the duck's state is already in the store and only its type's sprites are set up
+    def __init__(self, store, index, duck_type=DuckType.NORMAL, respawn=True):
+        self.store = store
+        self.index = index
+        if respawn:
+            self.setup(duck_type)
+        else:
+            self.set_type(duck_type)
+            self.score_value = DUCK_STATS[duck_type][1]
+            self.flap_direction = 1
+            self.flap_speed = 0.2
+            self.flap_offset = 0
+    
+    def reset(self):
+        self.store.respawn([self.index])
+        self.flap_direction = 1
+        self.flap_speed = 0.2
+        self.flap_offset = 0
+    
+    def update(self):
+        pass  # Moved by DuckStore.update
+
+# Array-backed projectiles, moved and bounds-checked with whole-array operations
+class ProjectileStore(EntityStore):
+    fields = {
+        "x": "<f8",
+        "y": "<f8",
+        "prev_x": "<f8",
+        "prev_y": "<f8",
+        "dx": "<f8",
+        "dy": "<f8",
+        "damage": "<i4",
+    }
+    
+    def add(self, x, y, target_x, target_y, weapon):
+        index = self.allocate()
+        view = ProjectileView(self, index, x, y, target_x, target_y, weapon)
+        self.views.append(view)
+        return view
+    
+    def update(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.x[:n] += self.dx[:n]
+        self.y[:n] += self.dy[:n]
+    
+    def remove_out_of_bounds(self):
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        out = (x < 0) | (x > SCREEN_WIDTH) | (y < 0) | (y > SCREEN_HEIGHT)
+        # Remove from the back so swapped-in entities have already been checked
+        for index in numpy.flatnonzero(out)[::-1].tolist():
+            self.remove(self.views[index])
+
+# Projectile whose position, velocity and damage live in a ProjectileStore
+class ProjectileView(Projectile):
+    __slots__ = ("store", "index")
+    
+    x = store_property("x")
+    y = store_property("y")
+    prev_x = store_property("prev_x")
+    prev_y = store_property("prev_y")
+    dx = store_property("dx")
+    dy = store_property("dy")
+    damage = store_property("damage", int)
+    
+    def __init__(self, store, index, x, y, target_x, target_y, weapon):
+        self.store = store
+        self.index = index
+        super().__init__(x, y, target_x, target_y, weapon)
+    
+    # View onto a projectile already in the store (after load_fields), without relaunching it
+    @classmethod
+    def attach(cls, store, index, weapon, angle, is_multi_shot):
+        view = cls.__new__(cls)
+        view.store = store
+        view.index = index
+        view.set_weapon(weapon)
+        view.angle = angle
+        view.rotated_image, view.draw_offset = get_rotated_projectile(weapon, angle)
+        view.is_multi_shot = is_multi_shot
+        return view
+    
+    def update(self):
+        pass  # Moved by ProjectileStore.update
+
 # Player/Crosshair class
 class Player:
     def __init__(self):
         self.x = SCREEN_WIDTH // 2
         self.y = SCREEN_HEIGHT // 2
         self.crosshair_size = 30
-        self.crosshair_image = create_crosshair_image(self.crosshair_size)
+        self.crosshair_image = get_baked_sprite(create_crosshair_image, self.crosshair_size)
         
         self.weapons = {
             WeaponType.GUN: Weapon(WeaponType.GUN),
@@ -567,15 +1485,18 @@ class Player:
             WeaponType.BOW: Weapon(WeaponType.BOW)
         }
         self.current_weapon = self.weapons[WeaponType.GUN]
+        self.projectile_factory = Projectile  # Called as (x, y, target_x, target_y, weapon)
         
         # Power-up effects
         self.active_powerups = {}  # {PowerUpType: remaining_time}
         self.damage_multiplier = 1.0
         self.cooldown_multiplier = 1.0
     
-    def update(self):
+    def update(self, mouse_pos=None):
         # Update position to mouse position
-        self.x, self.y = pygame.mouse.get_pos()
+        if mouse_pos is None:
+            mouse_pos = pygame.mouse.get_pos()
+        self.x, self.y = mouse_pos
         
         # Update current weapon
         self.current_weapon.update()
@@ -586,49 +1507,63 @@ class Player:
             if self.active_powerups[powerup_type] <= 0:
                 self.deactivate_powerup(powerup_type)
     
-    def draw(self, surface):
+    # Returns the rects that were drawn
+    # crosshair_pos overrides the simulated crosshair, e.g. with a mouse position read after the last tick
+    def draw(self, surface, crosshair_pos=None):
         # Draw crosshair
-        rect = self.crosshair_image.get_rect(center=(self.x, self.y))
-        surface.blit(self.crosshair_image, rect)
+        rect = self.crosshair_image.get_rect(center=crosshair_pos or (self.x, self.y))
+        rects = [surface.blit(self.crosshair_image, rect)]
         
         # Draw current weapon at bottom of screen
         weapon_rect = self.current_weapon.image.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 50))
-        surface.blit(self.current_weapon.image, weapon_rect)
+        rects.append(surface.blit(self.current_weapon.image, weapon_rect))
         
         # Draw ammo count
         if self.current_weapon.ammo >= 0:
-            ammo_text = font_small.render(f"Ammo: {self.current_weapon.ammo}", True, WHITE)
-            surface.blit(ammo_text, (SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT - 50))
+            ammo_text = render_text(font_small, f"Ammo: {self.current_weapon.ammo}", WHITE)
+            rects.append(surface.blit(ammo_text, (SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT - 50)))
         
         # Draw active power-ups
         x_offset = SCREEN_WIDTH - 150
         for powerup_type, time_left in self.active_powerups.items():
-            powerup_image = create_powerup_image(powerup_type)
-            surface.blit(powerup_image, (x_offset, 60))
-            time_text = font_small.render(f"{time_left // FPS}s", True, WHITE)
-            surface.blit(time_text, (x_offset + 35, 65))
+            powerup_image = get_powerup_image(powerup_type)
+            rects.append(surface.blit(powerup_image, (x_offset, 60)))
+            time_text = render_text(font_small, f"{time_left // FPS}s", WHITE)
+            rects.append(surface.blit(time_text, (x_offset + 35, 65)))
             x_offset += 70
+        
+        return rects
     
-    def shoot(self):
+    # Fire at the clicked point; tick_offset is how far into the tick (0-1) the click happened
+    def shoot(self, target=None, tick_offset=0.0):
         if self.current_weapon.can_shoot():
             self.current_weapon.shoot()
+            target_x, target_y = target if target is not None else (self.x, self.y)
             
             # Create projectile
-            projectile = Projectile(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100, self.x, self.y, self.current_weapon)
+            origin_x, origin_y = PROJECTILE_ORIGIN
+            projectile = self.projectile_factory(origin_x, origin_y, target_x, target_y, self.current_weapon)
             
             # Apply power-up effects
             if PowerUpType.DOUBLE_DAMAGE in self.active_powerups:
                 projectile.damage *= 2
-                
+            
+            projectiles = [projectile]
             # Multi-shot power-up
             if PowerUpType.MULTI_SHOT in self.active_powerups:
-                return [
-                    projectile,
-                    Projectile(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100, self.x + 30, self.y - 30, self.current_weapon),
-                    Projectile(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100, self.x - 30, self.y - 30, self.current_weapon)
-                ]
+                projectiles.append(self.projectile_factory(origin_x, origin_y, target_x + 30, target_y - 30,
+                                                           self.current_weapon))
+                projectiles.append(self.projectile_factory(origin_x, origin_y, target_x - 30, target_y - 30,
+                                                           self.current_weapon))
             
-            return [projectile]
+            # Start late shots behind the origin so this tick's move only covers the rest of the tick
+            if tick_offset:
+                for projectile in projectiles:
+                    projectile.x -= projectile.dx * tick_offset
+                    projectile.y -= projectile.dy * tick_offset
+                    projectile.prev_x = projectile.x
+                    projectile.prev_y = projectile.y
+            return projectiles
         return []
     
     def change_weapon(self, weapon_type):
@@ -649,10 +1584,8 @@ class Player:
             # Revert effects
             if powerup_type == PowerUpType.RAPID_FIRE:
                 # Reset weapon cooldowns to original values
-                self.weapons[WeaponType.GUN].max_cooldown = 20
-                self.weapons[WeaponType.KNIFE].max_cooldown = 15
-                self.weapons[WeaponType.STONE].max_cooldown = 25
-                self.weapons[WeaponType.BOW].max_cooldown = 40
+                for weapon_type, weapon in self.weapons.items():
+                    weapon.max_cooldown = WEAPON_STATS[weapon_type][0]
 
 # UI class for modern interface
 class UI:
@@ -664,59 +1597,124 @@ class UI:
             {"type": WeaponType.BOW, "rect": pygame.Rect(410, SCREEN_HEIGHT - 80, 100, 60), "text": "Bow"}
         ]
         
+        # Screen areas covered by the HUD
+        self.hud_rects = [pygame.Rect(0, 0, SCREEN_WIDTH, 50)] + [button["rect"] for button in self.weapon_buttons]
+        
         # Create background
-        self.background = create_background_image()
+        self.background_layers = get_background_layers()
+        self.background = get_background_image()
         
         # Menu animations
         self.menu_duck_x = -100
         self.menu_duck_y = 300
-        self.menu_duck_speed = 3
-        self.menu_duck_image = create_duck_image(DuckType.NORMAL, 80, 60)
+        self.menu_duck_speed = 3  # Pixels per 60 FPS frame
+        self.menu_duck_image = get_baked_sprite(create_duck_image, DuckType.NORMAL, 80, 60)
+        
+        # Menu buttons
+        self.start_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 350, 200, 60)
+        button_width = 120
+        total_width = button_width * 3 + 20 * 2  # 3 buttons with 20px spacing
+        start_x = SCREEN_WIDTH//2 - total_width//2
+        self.diff_buttons = [(pygame.Rect(start_x + i * (button_width + 20), 500, button_width, 50), i + 1)
+                             for i in range(3)]
+        
+        # Idle screens are only redrawn when what they show changes
+        self.overlays = {}  # {alpha: full-screen overlay surface}
+        self.screen_key = None  # What the menu, pause or game over screen currently shows
+        self.update_rects = None  # Rects to push in present(); None pushes the whole window
+        self.game_over_base = None
+        self.pause_base = None
+    
+    # Forget the composited idle screen, e.g. after switching game states
+    def invalidate(self):
+        self.screen_key = None
+        self.game_over_base = None
+        self.pause_base = None
+    
+    # Draw the idle screen in full again, e.g. after the window was exposed
+    # The composited bases are kept: the pause base can't be rebuilt from a screen that already shows it
+    def redraw(self):
+        self.screen_key = None
+    
+    def get_overlay(self, alpha):
+        overlay = self.overlays.get(alpha)
+        if overlay is None:
+            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, alpha))  # Semi-transparent black
+            self.overlays[alpha] = overlay
+        return overlay
+    
+    # Menu duck position, advanced in whole animation ticks
+    def get_menu_duck_x(self):
+        animation_tick = pygame.time.get_ticks() * MENU_ANIMATION_FPS // 1000
+        distance = animation_tick * self.menu_duck_speed * FPS // MENU_ANIMATION_FPS
+        return -100 + distance % (SCREEN_WIDTH + 200)
+    
+    # Push whatever the last idle screen draw changed
+    def present(self):
+        if self.update_rects is None:
+            pygame.display.flip()
+        elif self.update_rects:
+            pygame.display.update(self.update_rects)
     
     def draw_menu(self, surface):
+        mouse_pos = pygame.mouse.get_pos()
+        hovered = (self.start_button.collidepoint(mouse_pos),
+                   tuple(button.collidepoint(mouse_pos) for button, diff_level in self.diff_buttons))
+        key = ("menu", difficulty, hovered)
+        duck_x = self.get_menu_duck_x()
+        
+        if key != self.screen_key:
+            self.draw_menu_layers(surface, duck_x, mouse_pos)
+            self.update_rects = None
+        elif duck_x != self.menu_duck_x:
+            # Only recomposite the area the duck moved through
+            width, height = self.menu_duck_image.get_size()
+            dirty_rect = pygame.Rect(self.menu_duck_x, self.menu_duck_y, width, height)
+            dirty_rect.union_ip(pygame.Rect(duck_x, self.menu_duck_y, width, height))
+            surface.set_clip(dirty_rect)
+            self.draw_menu_layers(surface, duck_x, mouse_pos)
+            surface.set_clip(None)
+            self.update_rects = [dirty_rect]
+        else:
+            self.update_rects = []
+        
+        self.screen_key = key
+        self.menu_duck_x = duck_x
+        return self.start_button, self.diff_buttons
+    
+    def draw_menu_layers(self, surface, duck_x, mouse_pos):
         # Draw background
         surface.blit(self.background, (0, 0))
         
         # Draw animated duck
-        self.menu_duck_x += self.menu_duck_speed
-        if self.menu_duck_x > SCREEN_WIDTH + 100:
-            self.menu_duck_x = -100
-        surface.blit(self.menu_duck_image, (self.menu_duck_x, self.menu_duck_y))
+        surface.blit(self.menu_duck_image, (duck_x, self.menu_duck_y))
         
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-        surface.blit(overlay, (0, 0))
+        surface.blit(self.get_overlay(128), (0, 0))
         
         # Draw title with shadow
-        title_shadow = font_large.render("DUCK SHOOTER", True, BLACK)
-        title_text = font_large.render("DUCK SHOOTER", True, GOLD)
+        title_shadow = render_text(font_large, "DUCK SHOOTER", BLACK)
+        title_text = render_text(font_large, "DUCK SHOOTER", GOLD)
         surface.blit(title_shadow, (SCREEN_WIDTH//2 - title_text.get_width()//2 + 3, 203))
         surface.blit(title_text, (SCREEN_WIDTH//2 - title_text.get_width()//2, 200))
         
         # Draw start button with hover effect
-        mouse_pos = pygame.mouse.get_pos()
-        start_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 350, 200, 60)
+        start_button = self.start_button
         button_color = (0, 180, 0) if start_button.collidepoint(mouse_pos) else GREEN
         pygame.draw.rect(surface, button_color, start_button, border_radius=15)
         pygame.draw.rect(surface, WHITE, start_button, 2, border_radius=15)  # White border
         
-        start_text = font_medium.render("START", True, WHITE)
+        start_text = render_text(font_medium, "START", WHITE)
         surface.blit(start_text, (start_button.centerx - start_text.get_width()//2, start_button.centery - start_text.get_height()//2))
         
         # Draw difficulty buttons
-        diff_text = font_medium.render("Difficulty:", True, WHITE)
+        diff_text = render_text(font_medium, "Difficulty:", WHITE)
         surface.blit(diff_text, (SCREEN_WIDTH//2 - diff_text.get_width()//2, 450))
         
-        diff_buttons = []
         diff_labels = ["Easy", "Medium", "Hard"]
-        button_width = 120
-        total_width = button_width * 3 + 20 * 2  # 3 buttons with 20px spacing
-        start_x = SCREEN_WIDTH//2 - total_width//2
-        
-        for i, label in enumerate(diff_labels):
-            diff_button = pygame.Rect(start_x + i * (button_width + 20), 500, button_width, 50)
-            is_selected = difficulty == i + 1
+        for (diff_button, diff_level), label in zip(self.diff_buttons, diff_labels):
+            is_selected = difficulty == diff_level
             is_hovered = diff_button.collidepoint(mouse_pos)
             
             if is_selected:
@@ -727,10 +1725,9 @@ class UI:
             pygame.draw.rect(surface, button_color, diff_button, border_radius=10)
             pygame.draw.rect(surface, WHITE, diff_button, 2, border_radius=10)  # White border
             
-            diff_label = font_small.render(label, True, WHITE)
+            diff_label = render_text(font_small, label, WHITE)
             surface.blit(diff_label, (diff_button.centerx - diff_label.get_width()//2, 
                                      diff_button.centery - diff_label.get_height()//2))
-            diff_buttons.append((diff_button, i + 1))
         
         # Draw instructions
         instructions = [
@@ -741,89 +1738,106 @@ class UI:
         ]
         
         for i, instruction in enumerate(instructions):
-            instr_text = font_small.render(instruction, True, WHITE)
+            instr_text = render_text(font_small, instruction, WHITE)
             surface.blit(instr_text, (SCREEN_WIDTH//2 - instr_text.get_width()//2, 600 + i * 30))
-        
-        return start_button, diff_buttons
     
     def draw_game_over(self, surface, score):
-        # Draw background with overlay
-        surface.blit(self.background, (0, 0))
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Semi-transparent black
-        surface.blit(overlay, (0, 0))
-        
-        # Draw game over text with shadow
-        game_over_shadow = font_large.render("GAME OVER", True, BLACK)
-        game_over_text = font_large.render("GAME OVER", True, RED)
-        surface.blit(game_over_shadow, (SCREEN_WIDTH//2 - game_over_text.get_width()//2 + 3, 153))
-        surface.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, 150))
-        
-        # Draw score
-        score_text = font_medium.render(f"Final Score: {score}", True, WHITE)
-        surface.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 250))
-        
-        # Draw high scores
-        high_score_title = font_medium.render("High Scores", True, GOLD)
-        surface.blit(high_score_title, (SCREEN_WIDTH//2 - high_score_title.get_width()//2, 300))
+        restart_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 550, 200, 60)
+        menu_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 630, 200, 60)
+        mouse_pos = pygame.mouse.get_pos()
+        scores = get_high_scores(difficulty)
+        key = ("game_over", score, tuple(scores),
+               restart_button.collidepoint(mouse_pos), menu_button.collidepoint(mouse_pos))
+        if key == self.screen_key:
+            self.update_rects = []
+            return restart_button, menu_button
+        self.screen_key = key
+        self.update_rects = None
+        
+        if self.game_over_base is None:
+            # Draw background with overlay
+            base = self.background.copy()
+            base.blit(self.get_overlay(180), (0, 0))
+            
+            # Draw game over text with shadow
+            game_over_shadow = render_text(font_large, "GAME OVER", BLACK)
+            game_over_text = render_text(font_large, "GAME OVER", RED)
+            base.blit(game_over_shadow, (SCREEN_WIDTH//2 - game_over_text.get_width()//2 + 3, 153))
+            base.blit(game_over_text, (SCREEN_WIDTH//2 - game_over_text.get_width()//2, 150))
+            
+            # Draw score
+            score_text = render_text(font_medium, f"Final Score: {score}", WHITE)
+            base.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, 250))
+            
+            # Draw high scores
+            high_score_title = render_text(font_medium, "High Scores", GOLD)
+            base.blit(high_score_title, (SCREEN_WIDTH//2 - high_score_title.get_width()//2, 300))
+            
+            for i, (hs, level) in enumerate(scores):
+                hs_text = render_text(font_small, f"{i+1}. {hs}  (level {level})", WHITE)
+                base.blit(hs_text, (SCREEN_WIDTH//2 - 80, 350 + i * 30))
+            self.game_over_base = base
         
-        for i, hs in enumerate(high_scores):
-            hs_text = font_small.render(f"{i+1}. {hs}", True, WHITE)
-            surface.blit(hs_text, (SCREEN_WIDTH//2 - 50, 350 + i * 30))
+        surface.blit(self.game_over_base, (0, 0))
         
         # Draw restart button with hover effect
-        mouse_pos = pygame.mouse.get_pos()
-        restart_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 550, 200, 60)
         button_color = (0, 180, 0) if restart_button.collidepoint(mouse_pos) else GREEN
         pygame.draw.rect(surface, button_color, restart_button, border_radius=15)
         pygame.draw.rect(surface, WHITE, restart_button, 2, border_radius=15)  # White border
         
-        restart_text = font_medium.render("RESTART", True, WHITE)
+        restart_text = render_text(font_medium, "RESTART", WHITE)
         surface.blit(restart_text, (restart_button.centerx - restart_text.get_width()//2, 
                                   restart_button.centery - restart_text.get_height()//2))
         
         # Draw menu button
-        menu_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 630, 200, 60)
         button_color = (0, 0, 180) if menu_button.collidepoint(mouse_pos) else BLUE
         pygame.draw.rect(surface, button_color, menu_button, border_radius=15)
         pygame.draw.rect(surface, WHITE, menu_button, 2, border_radius=15)  # White border
         
-        menu_text = font_medium.render("MENU", True, WHITE)
+        menu_text = render_text(font_medium, "MENU", WHITE)
         surface.blit(menu_text, (menu_button.centerx - menu_text.get_width()//2, 
                                menu_button.centery - menu_text.get_height()//2))
         
         return restart_button, menu_button
     
     def draw_pause_menu(self, surface):
-        # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Semi-transparent black
-        surface.blit(overlay, (0, 0))
-        
-        # Draw pause text
-        pause_text = font_large.render("PAUSED", True, WHITE)
-        surface.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, 200))
-        
-        # Draw buttons
+        resume_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 300, 200, 60)
+        menu_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 380, 200, 60)
         mouse_pos = pygame.mouse.get_pos()
+        key = ("pause", resume_button.collidepoint(mouse_pos), menu_button.collidepoint(mouse_pos))
+        if key == self.screen_key:
+            self.update_rects = []
+            return resume_button, menu_button
+        self.screen_key = key
+        self.update_rects = None
+        
+        if self.pause_base is None:
+            # Darken the last game frame once
+            base = surface.copy()
+            base.blit(self.get_overlay(180), (0, 0))
+            
+            # Draw pause text
+            pause_text = render_text(font_large, "PAUSED", WHITE)
+            base.blit(pause_text, (SCREEN_WIDTH//2 - pause_text.get_width()//2, 200))
+            self.pause_base = base
+        
+        surface.blit(self.pause_base, (0, 0))
         
         # Resume button
-        resume_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 300, 200, 60)
         button_color = (0, 180, 0) if resume_button.collidepoint(mouse_pos) else GREEN
         pygame.draw.rect(surface, button_color, resume_button, border_radius=15)
         pygame.draw.rect(surface, WHITE, resume_button, 2, border_radius=15)
         
-        resume_text = font_medium.render("RESUME", True, WHITE)
+        resume_text = render_text(font_medium, "RESUME", WHITE)
         surface.blit(resume_text, (resume_button.centerx - resume_text.get_width()//2, 
                                  resume_button.centery - resume_text.get_height()//2))
         
         # Menu button
-        menu_button = pygame.Rect(SCREEN_WIDTH//2 - 100, 380, 200, 60)
         button_color = (0, 0, 180) if menu_button.collidepoint(mouse_pos) else BLUE
         pygame.draw.rect(surface, button_color, menu_button, border_radius=15)
         pygame.draw.rect(surface, WHITE, menu_button, 2, border_radius=15)
         
-        menu_text = font_medium.render("MENU", True, WHITE)
+        menu_text = render_text(font_medium, "MENU", WHITE)
         surface.blit(menu_text, (menu_button.centerx - menu_text.get_width()//2, 
                                menu_button.centery - menu_text.get_height()//2))
         
@@ -834,19 +1848,19 @@ class UI:
         pygame.draw.rect(surface, (50, 50, 50, 200), (0, 0, SCREEN_WIDTH, 50))
         
         # Draw score
-        score_text = font_medium.render(f"Score: {score}", True, WHITE)
+        score_text = render_text(font_medium, f"Score: {score}", WHITE)
         surface.blit(score_text, (20, 10))
         
         # Draw level
-        level_text = font_medium.render(f"Level: {level}", True, WHITE)
+        level_text = render_text(font_medium, f"Level: {level}", WHITE)
         surface.blit(level_text, (200, 10))
         
         # Draw ducks progress
-        progress_text = font_medium.render(f"Ducks: {ducks_killed}/{ducks_needed}", True, WHITE)
+        progress_text = render_text(font_medium, f"Ducks: {ducks_killed}/{ducks_needed}", WHITE)
         surface.blit(progress_text, (350, 10))
         
         # Draw time remaining
-        time_text = font_medium.render(f"Time: {time_remaining}", True, WHITE)
+        time_text = render_text(font_medium, f"Time: {time_remaining}", WHITE)
         surface.blit(time_text, (550, 10))
         
         # Draw weapon selection buttons
@@ -860,14 +1874,14 @@ class UI:
             pygame.draw.rect(surface, color, button["rect"], border_radius=10)
             pygame.draw.rect(surface, WHITE, button["rect"], 2, border_radius=10)  # White border
             
-            text = font_small.render(button["text"], True, WHITE)
+            text = render_text(font_small, button["text"], WHITE)
             surface.blit(text, (button["rect"].centerx - text.get_width()//2, 
                                button["rect"].centery - text.get_height()//2))
             
             # Draw ammo count
             ammo = player.weapons[button["type"]].ammo
             if ammo >= 0:
-                ammo_text = font_small.render(f"{ammo}", True, WHITE)
+                ammo_text = render_text(font_small, f"{ammo}", WHITE)
                 surface.blit(ammo_text, (button["rect"].right - ammo_text.get_width() - 5, 
                                        button["rect"].bottom - ammo_text.get_height() - 5))
     
@@ -877,75 +1891,1741 @@ class UI:
                 return button["type"]
         return None
 
-# Game initialization
-def init_game():
-    global score, game_state, level, ducks_killed, ducks_needed_for_next_level, time_remaining
+# Collects per-frame wall time for named phases of the frame loop
+# Call begin_frame(), then mark(phase) as each phase finishes, then end_frame()
+class PhaseTimer:
+    def __init__(self, history=None):
+        self.frames = deque(maxlen=history)  # One {phase: seconds} dict per finished frame
+        self.current = {}
+        self.last = 0.0
     
-    score = 0
-    game_state = GameState.PLAYING
-    level = 1
-    ducks_killed = 0
-    ducks_needed_for_next_level = 10 * level
-    time_remaining = 60  # seconds
+    def begin_frame(self):
+        self.current = {}
+        self.last = time.perf_counter()
+    
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+        self.last = now
+    
+    def end_frame(self):
+        self.frames.append(self.current)
+
+# Sort key listing phases in pipeline order, with phases outside PROFILER_PHASES last
+def get_profiler_phase_order(phase):
+    return PROFILER_PHASES.index(phase) if phase in PROFILER_PHASES else len(PROFILER_PHASES)
+
+# In-game frame profiler: rolling frame-time graph, per-phase bars, Chrome trace and cProfile dumps
+# F3 toggles the overlay, F4 dumps a Chrome trace of the recorded frames, F5 profiles the next frames
+class FrameProfiler(PhaseTimer):
+    def __init__(self, history=PROFILER_HISTORY):
+        super().__init__(history)
+        self.enabled = False
+        self.origin = time.perf_counter()  # Trace timestamps are relative to this
+        self.span_frames = deque(maxlen=history)  # One [(phase, start, duration), ...] list per frame
+        self.current_spans = []
+        self.cprofile = None
+        self.cprofile_frames_left = 0
+        self.font = pygame.font.SysFont('Arial', 14)
+        self.panel = None
+        self.labels = []  # Rendered phase labels, refreshed a few times per second
+        self.labels_age = 0
+    
+    # Whether step() and draw() should report phases this frame
+    def is_recording(self):
+        return self.enabled or self.cprofile is not None
+    
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frames.clear()
+        self.span_frames.clear()
+    
+    def begin_frame(self):
+        super().begin_frame()
+        self.current_spans = []
+    
+    def mark(self, phase):
+        start = self.last
+        super().mark(phase)
+        self.current_spans.append((phase, start, self.last - start))
+    
+    def end_frame(self):
+        super().end_frame()
+        self.span_frames.append(self.current_spans)
+        
+        if self.cprofile is not None:
+            self.cprofile_frames_left -= 1
+            if self.cprofile_frames_left <= 0:
+                self.cprofile.disable()
+                path = self.get_output_path("profile", "prof")
+                self.cprofile.dump_stats(path)
+                self.cprofile = None
+                print(f"cProfile capture written to {path}")
+    
+    def get_output_path(self, prefix, extension):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        return os.path.join(PROFILE_DIR, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}.{extension}")
     
-    player = Player()
+    # Start a cProfile capture covering the next frame_count frames
+    def start_cprofile(self, frame_count=PROFILER_CAPTURE_FRAMES):
+        if self.cprofile is not None:
+            return
+        self.cprofile = cProfile.Profile()
+        self.cprofile_frames_left = frame_count
+        self.cprofile.enable()
     
-    # Create ducks based on difficulty and level
-    ducks = []
-    num_ducks = 3 + (level - 1) + difficulty
+    # Write the recorded frames as a Chrome trace_event file (open in chrome://tracing or Perfetto)
+    def dump_chrome_trace(self):
+        events = []
+        for frame_number, spans in enumerate(self.span_frames):
+            if not spans:
+                continue
+            frame_start = spans[0][1]
+            frame_end = spans[-1][1] + spans[-1][2]
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "args": {"frame": frame_number},
+                           "ts": (frame_start - self.origin) * 1e6, "dur": (frame_end - frame_start) * 1e6})
+            for phase, start, duration in spans:
+                events.append({"name": phase, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (start - self.origin) * 1e6, "dur": duration * 1e6})
+        if not events:
+            print("No frames recorded; press F3 to start recording")
+            return None
+        path = self.get_output_path("trace", "json")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Chrome trace written to {path}")
+        return path
     
-    for i in range(num_ducks):
+    def draw(self, surface):
+        if self.panel is None:
+            self.panel = pygame.Surface((320, 230), pygame.SRCALPHA)
+            self.panel.fill((0, 0, 0, 170))
+        x, y = 10, 60
+        surface.blit(self.panel, (x, y))
+        frames = list(self.frames)
+        if not frames:
+            return
+        
+        # Rolling frame-time graph, 2 frame budgets tall, with the budget marked
+        graph_width, graph_height = 300, 80
+        budget_ms = TICK_TIME * 1000
+        scale = graph_height / (2 * budget_ms)
+        budget_y = y + 10 + graph_height - budget_ms * scale
+        pygame.draw.line(surface, GREEN, (x + 10, budget_y), (x + 10 + graph_width, budget_y), 1)
+        totals = [sum(frame.values()) * 1000 for frame in frames]
+        if len(totals) > 1:
+            step = graph_width / (self.frames.maxlen - 1)
+            points = [(x + 10 + i * step, y + 10 + graph_height - min(total * scale, graph_height))
+                      for i, total in enumerate(totals)]
+            pygame.draw.lines(surface, ORANGE, False, points, 1)
+        
+        # Per-phase bars averaged over the last second
+        recent = frames[-FPS:]
+        self.labels_age -= 1
+        if self.labels_age <= 0:
+            self.labels = []
+            phases = sorted({phase for frame in recent for phase in frame}, key=get_profiler_phase_order)
+            for phase in phases:
+                average_ms = sum(frame.get(phase, 0.0) for frame in recent) * 1000 / len(recent)
+                self.labels.append((average_ms, self.font.render(f"{phase} {average_ms:.2f} ms", True, WHITE)))
+            average_total = sum(totals[-FPS:]) / len(recent)
+            self.labels.append((None, self.font.render(f"frame {average_total:.2f} ms  max {max(totals):.2f} ms",
+                                                       True, WHITE)))
+            self.labels_age = FPS // 4
+        
+        bar_y = y + graph_height + 20
+        for average_ms, label in self.labels:
+            if average_ms is not None:
+                bar_width = min(160, average_ms * 160 / budget_ms)
+                pygame.draw.rect(surface, RED if average_ms > budget_ms / 2 else BLUE, (x + 150, bar_y + 3, bar_width, 9))
+            surface.blit(label, (x + 10, bar_y))
+            bar_y += 15
+
+# Free list of entity instances, recycled through their setup() method instead of reallocated
+class EntityPool:
+    def __init__(self, entity_class):
+        self.entity_class = entity_class
+        self.free = []
+    
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.setup(*args)
+            return entity
+        return self.entity_class(*args)
+    
+    def release(self, entity):
+        self.free.append(entity)
+
+# Index of the range each element belongs to, and the element itself, for the concatenated ranges
+# [start, start + count)
+def expand_ranges(starts, counts):
+    owners = numpy.repeat(numpy.arange(len(counts)), counts)
+    return owners, numpy.arange(len(owners)) - (numpy.cumsum(counts) - counts)[owners] + starts[owners]
+
+# Broad phase for sweep_projectile_hits: projectile and duck index pairs that may overlap, given the
+# boxes each one covers over the tick
+# Ducks are bucketed into COLLISION_ROW_HEIGHT strips by the top of their box and sorted by its left
+# edge within a strip. No duck box is larger than the largest one, so a projectile only searches the
+# strips and the x range that size can reach, by binary search, instead of testing every duck
+def get_collision_candidates(proj_left, proj_top, proj_right, proj_bottom, duck_left, duck_top, duck_right,
+                             duck_bottom):
+    reach_x = (duck_right - duck_left).max()
+    reach_y = (duck_bottom - duck_top).max()
+    # One sort key per duck: its strip, then its left edge; span keeps each strip's keys below the next one's
+    x_origin = min(duck_left.min(), proj_left.min() - reach_x)
+    span = max(duck_left.max(), proj_right.max()) - x_origin + 2
+    keys = numpy.floor_divide(duck_top, COLLISION_ROW_HEIGHT) * span + (duck_left - x_origin)
+    order = numpy.argsort(keys, kind="stable")
+    keys = keys[order]
+    
+    # One query per projectile and strip it can reach, widened by a pixel against rounding
+    first_row = numpy.floor_divide(proj_top - reach_y, COLLISION_ROW_HEIGHT)
+    row_counts = (numpy.floor_divide(proj_bottom, COLLISION_ROW_HEIGHT) - first_row + 1).astype(numpy.intp)
+    query_proj, rows = expand_ranges(first_row, row_counts)
+    lo = numpy.searchsorted(keys, rows * span + (proj_left[query_proj] - reach_x - x_origin) - 1)
+    hi = numpy.searchsorted(keys, rows * span + (proj_right[query_proj] - x_origin) + 1, side="right")
+    query_index, positions = expand_ranges(lo, hi - lo)
+    return query_proj[query_index], order[positions]
+
+# Swept collision of projectiles against ducks for one tick
+# Both move in a straight line during the tick, so in each duck's frame of reference the projectile
+# traces a segment; the slab method finds when that segment enters and leaves the duck's box.
+# Pairs whose bounding boxes over the tick overlap are found for all projectiles and ducks at once
+# through get_collision_candidates, and only those are tested exactly. Returns lists of the hitting
+# projectile indices, duck indices, the times (0-1) the path enters and leaves each box and whether the
+# duck is unclaimed (no earlier projectile's path reaches it, so it can't be dead by this projectile's
+# turn), ordered by projectile and then by entry time
+def sweep_projectile_hits(proj_prev_x, proj_prev_y, proj_x, proj_y, duck_prev_x, duck_prev_y, duck_x, duck_y,
+                          width, height):
+    if not len(proj_x) or not len(duck_x):
+        return [], [], [], [], []
+    proj_left = numpy.minimum(proj_prev_x, proj_x)
+    proj_right = numpy.maximum(proj_prev_x, proj_x)
+    proj_top = numpy.minimum(proj_prev_y, proj_y)
+    proj_bottom = numpy.maximum(proj_prev_y, proj_y)
+    duck_left = numpy.minimum(duck_prev_x, duck_x)
+    duck_right = numpy.maximum(duck_prev_x, duck_x) + width
+    duck_top = numpy.minimum(duck_prev_y, duck_y)
+    duck_bottom = numpy.maximum(duck_prev_y, duck_y) + height
+    if len(proj_x) * len(duck_x) <= COLLISION_ALL_PAIRS_LIMIT:
+        # Few enough pairs that testing them all at once is cheaper than the broad phase
+        overlap = ((proj_left[:, None] <= duck_right) & (proj_right[:, None] >= duck_left) &
+                   (proj_top[:, None] <= duck_bottom) & (proj_bottom[:, None] >= duck_top))
+        # flatnonzero is much faster than nonzero on 2D masks
+        proj_index, duck_index = numpy.divmod(numpy.flatnonzero(overlap), len(duck_x))
+    else:
+        proj_index, duck_index = get_collision_candidates(proj_left, proj_top, proj_right, proj_bottom, duck_left,
+                                                          duck_top, duck_right, duck_bottom)
+        overlap = ((proj_left[proj_index] <= duck_right[duck_index]) &
+                   (proj_right[proj_index] >= duck_left[duck_index]) &
+                   (proj_top[proj_index] <= duck_bottom[duck_index]) &
+                   (proj_bottom[proj_index] >= duck_top[duck_index]))
+        proj_index, duck_index = proj_index[overlap], duck_index[overlap]
+    if not len(proj_index):
+        return [], [], [], [], []
+    
+    enter = numpy.zeros(len(proj_index))
+    leave = numpy.ones(len(proj_index))
+    for proj_start, proj_end, duck_start, duck_end, size in ((proj_prev_x, proj_x, duck_prev_x, duck_x, width),
+                                                             (proj_prev_y, proj_y, duck_prev_y, duck_y, height)):
+        # Projectile position relative to the duck's corner at the start of the tick, and its relative motion
+        start = proj_start[proj_index] - duck_start[duck_index]
+        move = (proj_end - proj_start)[proj_index] - (duck_end - duck_start)[duck_index]
+        if numpy.ndim(size):
+            size = size[duck_index]
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            near = -start / move
+            far = (size - start) / move
+        near, far = numpy.minimum(near, far), numpy.maximum(near, far)
+        
+        # No relative motion on this axis: inside the slab for the whole tick or never
+        still = move == 0
+        if still.any():
+            inside = (start >= 0) & (start <= size)
+            near[still] = numpy.where(inside[still], -numpy.inf, numpy.inf)
+            far[still] = numpy.where(inside[still], numpy.inf, -numpy.inf)
+        numpy.maximum(enter, near, out=enter)
+        numpy.minimum(leave, far, out=leave)
+    
+    hit = enter <= leave
+    proj_index, duck_index, enter, leave = proj_index[hit], duck_index[hit], enter[hit], leave[hit]
+    # Complex numbers sort by real then imaginary part, so this orders by projectile and entry time much
+    # faster than lexsort; only runs of equal times then need ordering by duck
+    order = numpy.argsort(proj_index + 1j * enter, kind="stable")
+    ties = (proj_index[order][1:] == proj_index[order][:-1]) & (enter[order][1:] == enter[order][:-1])
+    if ties.any():
+        tied = numpy.flatnonzero(numpy.concatenate(([False], ties)) | numpy.concatenate((ties, [False])))
+        runs = order[tied]
+        order[tied] = runs[numpy.lexsort((duck_index[runs], enter[runs], proj_index[runs]))]
+    proj_index, duck_index = proj_index[order], duck_index[order]
+    first_proj = numpy.full(len(duck_x), len(proj_x))
+    numpy.minimum.at(first_proj, duck_index, proj_index)
+    return (proj_index.tolist(), duck_index.tolist(), enter[order].tolist(), leave[order].tolist(),
+            (first_proj[duck_index] == proj_index).tolist())
+
+# sweep_projectile_hits for plain sequences when NumPy is not installed, with the same broad phase
+# and the same arithmetic, so both find exactly the same hits
+def sweep_projectile_hits_python(proj_prev_x, proj_prev_y, proj_x, proj_y, duck_prev_x, duck_prev_y, duck_x, duck_y,
+                                 width, height):
+    if not proj_x or not duck_x:
+        return [], [], [], [], []
+    duck_boxes = [(min(prev_x, x), min(prev_y, y), max(prev_x, x) + duck_width, max(prev_y, y) + duck_height)
+                  for prev_x, prev_y, x, y, duck_width, duck_height in zip(duck_prev_x, duck_prev_y, duck_x, duck_y,
+                                                                           width, height)]
+    reach_x = max(right - left for left, top, right, bottom in duck_boxes)
+    reach_y = max(bottom - top for left, top, right, bottom in duck_boxes)
+    keys = sorted((top // COLLISION_ROW_HEIGHT, left, duck_index)
+                  for duck_index, (left, top, right, bottom) in enumerate(duck_boxes))
+    
+    hits = []
+    for proj_index, path in enumerate(zip(proj_prev_x, proj_prev_y, proj_x, proj_y)):
+        prev_x, prev_y, x, y = path
+        proj_left, proj_right = min(prev_x, x), max(prev_x, x)
+        proj_top, proj_bottom = min(prev_y, y), max(prev_y, y)
+        first_row = (proj_top - reach_y) // COLLISION_ROW_HEIGHT
+        last_row = proj_bottom // COLLISION_ROW_HEIGHT
+        row = first_row
+        while row <= last_row:
+            lo = bisect.bisect_left(keys, (row, proj_left - reach_x - 1))
+            hi = bisect.bisect_right(keys, (row, proj_right + 1, len(duck_boxes)))
+            row += 1
+            for key_row, key_left, duck_index in keys[lo:hi]:
+                left, top, right, bottom = duck_boxes[duck_index]
+                if proj_left > right or proj_right < left or proj_top > bottom or proj_bottom < top:
+                    continue
+                enter = 0.0
+                leave = 1.0
+                for proj_start, proj_end, duck_start, duck_end, size in (
+                        (prev_x, x, duck_prev_x[duck_index], duck_x[duck_index], width[duck_index]),
+                        (prev_y, y, duck_prev_y[duck_index], duck_y[duck_index], height[duck_index])):
+                    start = proj_start - duck_start
+                    move = (proj_end - proj_start) - (duck_end - duck_start)
+                    if move == 0:
+                        inside = 0 <= start <= size
+                        near, far = (-math.inf, math.inf) if inside else (math.inf, -math.inf)
+                    else:
+                        near, far = -start / move, (size - start) / move
+                        near, far = min(near, far), max(near, far)
+                    enter = max(enter, near)
+                    leave = min(leave, far)
+                if enter <= leave:
+                    hits.append((proj_index, enter, duck_index, leave))
+    hits.sort()
+    first_proj = {}
+    for proj_index, enter, duck_index, leave in hits:
+        first_proj.setdefault(duck_index, proj_index)
+    return ([hit[0] for hit in hits], [hit[2] for hit in hits], [hit[1] for hit in hits], [hit[3] for hit in hits],
+            [first_proj[hit[2]] == hit[0] for hit in hits])
+
+# End of the run of hits belonging to the projectile at hits[0][start]
+def get_projectile_hits_end(hits, start):
+    return bisect.bisect_right(hits[0], hits[0][start], start)
+
+# Narrow box hits from sweep_projectile_hits down to the ducks' opaque pixels
+# Steps each path through its box half a pixel at a time, so diagonal paths don't skip corners, against
+# the precomputed mask of the duck's current frame; no mask is built during play. A projectile's boxes
+# are tried in entry order only until one entered after its first pixel hit on an unclaimed duck, since
+# resolve_hits never gets past that hit. Returns the hits in the same form, timed by the first pixel touched
+def refine_pixel_hits(hits, proj_prev_x, proj_prev_y, proj_x, proj_y, duck_prev_x, duck_prev_y, duck_x, duck_y,
+                      ducks):
+    proj_indices, duck_indices, enters, leaves, unclaimed = hits
+    pixel_hits = []
+    start = 0
+    while start < len(proj_indices):
+        end = get_projectile_hits_end(hits, start)
+        proj_index = proj_indices[start]
+        first_unclaimed = math.inf
+        for i in range(start, end):
+            enter = enters[i]
+            if enter > first_unclaimed:
+                break
+            duck_index = duck_indices[i]
+            leave = leaves[i]
+            start_x = float(proj_prev_x[proj_index] - duck_prev_x[duck_index])
+            start_y = float(proj_prev_y[proj_index] - duck_prev_y[duck_index])
+            move_x = float((proj_x[proj_index] - proj_prev_x[proj_index]) -
+                           (duck_x[duck_index] - duck_prev_x[duck_index]))
+            move_y = float((proj_y[proj_index] - proj_prev_y[proj_index]) -
+                           (duck_y[duck_index] - duck_prev_y[duck_index]))
+            mask = ducks[duck_index].get_mask()
+            width, height = mask.get_size()
+            steps = max(1, math.ceil(2 * max(abs(move_x), abs(move_y)) * (leave - enter)))
+            for step in range(steps + 1):
+                t = enter + (leave - enter) * step / steps
+                x = int(start_x + move_x * t)
+                y = int(start_y + move_y * t)
+                if 0 <= x < width and 0 <= y < height and mask.get_at((x, y)):
+                    pixel_hits.append((proj_index, t, duck_index, leave, unclaimed[i]))
+                    if unclaimed[i]:
+                        first_unclaimed = min(first_unclaimed, t)
+                    break
+        start = end
+    pixel_hits.sort()
+    return tuple([hit[field] for hit in pixel_hits] for field in (0, 2, 1, 3, 4))
+
+# Input for a single simulation step
+class TickInput:
+    def __init__(self, mouse_pos, clicks=(), weapon=None):
+        self.mouse_pos = mouse_pos  # Crosshair position at the end of the tick
+        # Shooting clicks during the tick as (x, y, tick offset); plain (x, y) clicks happen at the tick's start
+        self.clicks = [click if len(click) == 3 else (click[0], click[1], 0.0) for click in clicks]
+        self.weapon = weapon  # WeaponType to switch to, or None
+
+# Length a save_snapshot() buffer must have, going by the counts in it
+# Raises struct.error if the buffer ends before one of the counts
+def get_snapshot_size(data):
+    flags = struct.unpack_from(SNAPSHOT_HEADER, data)[3]
+    offset = struct.calcsize(SNAPSHOT_HEADER) + struct.calcsize(SNAPSHOT_SESSION)
+    level_count = struct.unpack_from(SNAPSHOT_STATS, data, offset)[-1]
+    offset += struct.calcsize(SNAPSHOT_STATS) + struct.calcsize(f"<{level_count}i") + struct.calcsize(SNAPSHOT_RNG)
+    if flags & 1:
+        offset += struct.calcsize(SNAPSHOT_NUMPY_RNG)
+    powerup_count = struct.unpack_from(SNAPSHOT_PLAYER, data, offset)[-1]
+    offset += (struct.calcsize(SNAPSHOT_PLAYER) + len(WeaponType) * struct.calcsize(SNAPSHOT_WEAPON) +
+               powerup_count * struct.calcsize(SNAPSHOT_ACTIVE_POWERUP))
+    duck_count, projectile_count, powerup_count = struct.unpack_from("<3I", data, offset)
+    offset += struct.calcsize("<3I") + powerup_count * struct.calcsize(SNAPSHOT_POWERUP)
+    if flags & 1:
+        return (offset + duck_count * DuckStore.get_entity_size() + projectile_count *
+                (ProjectileStore.get_entity_size() + struct.calcsize(SNAPSHOT_PROJECTILE_VIEW)))
+    return (offset + duck_count * struct.calcsize(SNAPSHOT_DUCK) +
+            projectile_count * struct.calcsize(SNAPSHOT_PROJECTILE))
+
+# Simulation state of one game, independent of the display
+# With use_entity_store, ducks and projectiles live in NumPy arrays for very large waves
+# All randomness comes from the session's seed, so the same seed and inputs replay the same game
+class GameSession:
+    def __init__(self, difficulty=1, use_entity_store=False, seed=None, pixel_hits=PIXEL_PERFECT_HITS):
+        self.difficulty = difficulty
+        self.use_entity_store = use_entity_store
+        self.pixel_hits = pixel_hits
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.score = 0
+        self.level = 1
+        self.ducks_killed = 0
+        self.ducks_needed_for_next_level = KILLS_PER_LEVEL * self.level
+        self.time_remaining = GAME_TIME  # seconds
+        self.game_over = False
+        
+        # Whole-game statistics for bots and balancing runs
+        self.shots_fired = 0
+        self.hits = 0
+        self.total_kills = 0
+        self.kills_by_type = {duck_type: 0 for duck_type in DuckType}
+        self.level_ticks = []  # Tick on which each level was cleared
+        
+        self.player = Player()
+        self.duck_pool = EntityPool(Duck)
+        self.projectile_pool = EntityPool(Projectile)
+        self.powerup_pool = EntityPool(PowerUp)
+        self.duck_store = None
+        self.projectile_store = None
+        if use_entity_store:
+            self.duck_store = DuckStore(seed=self.seed)
+            self.projectile_store = ProjectileStore()
+            self.ducks = self.duck_store.views
+            self.projectiles = self.projectile_store.views
+            self.player.projectile_factory = self.projectile_store.add
+        else:
+            self.ducks = []
+            self.projectiles = []
+            self.player.projectile_factory = self.projectile_pool.acquire
+        self.powerups = []
+        
+        # Create ducks based on difficulty and level
+        for i in range(self.get_duck_count()):
+            self.add_duck()
+        
+        # Timer for power-up spawning
+        self.powerup_timer = self.rng.randint(FPS * 10, FPS * 20)  # 10-20 seconds
+        
+        # Timer for game time
+        self.game_timer = 0
+        
+        self.phase_timer = None  # Optional PhaseTimer for profiling step()
+        self.recorder = None  # Optional InputRecorder logging every step()
+    
+    def get_duck_count(self):
+        return (DUCK_COUNT_BASE + DUCK_COUNT_PER_LEVEL * (self.level - 1) +
+                DUCK_COUNT_PER_DIFFICULTY * self.difficulty)
+    
+    def choose_duck_type(self):
         # Add different duck types based on level and difficulty
-        if level >= 3 and random.random() < 0.2:
-            ducks.append(Duck(DuckType.GOLDEN))
-        elif level >= 2 and random.random() < 0.3:
-            ducks.append(Duck(DuckType.FAST))
-        elif level >= 2 and random.random() < 0.3:
-            ducks.append(Duck(DuckType.ARMORED))
+        if self.level >= 3 and self.rng.random() < 0.2:
+            return DuckType.GOLDEN
+        elif self.level >= 2 and self.rng.random() < 0.3:
+            return DuckType.FAST
+        elif self.level >= 2 and self.rng.random() < 0.3:
+            return DuckType.ARMORED
         else:
-            ducks.append(Duck(DuckType.NORMAL))
+            return DuckType.NORMAL
     
-    projectiles = []
-    powerups = []
-    ui = UI()
+    def add_duck(self, duck_type=None):
+        if duck_type is None:
+            duck_type = self.choose_duck_type()
+        if self.duck_store is not None:
+            return self.duck_store.add(duck_type)
+        duck = self.duck_pool.acquire(duck_type, self.rng)
+        duck.index = len(self.ducks)
+        self.ducks.append(duck)
+        return duck
     
-    # Timer for power-up spawning
-    powerup_timer = random.randint(FPS * 10, FPS * 20)  # 10-20 seconds
+    def remove_duck(self, duck):
+        if self.duck_store is not None:
+            self.duck_store.remove(duck)
+            return
+        
+        # Swap the last duck into the hole instead of shifting the list
+        last = self.ducks.pop()
+        if last is not duck:
+            self.ducks[duck.index] = last
+            last.index = duck.index
+        duck.index = -1
+        self.duck_pool.release(duck)
+    
+    # Advance the game by one fixed tick (1 / FPS seconds); never touches the display
+    def step(self, inputs):
+        if self.game_over:
+            return
+        if self.recorder is not None:
+            self.recorder.record(inputs)
+        
+        # Update game timer
+        self.game_timer += 1
+        if self.game_timer % FPS == 0:  # Every second
+            self.time_remaining -= 1
+            if self.time_remaining <= 0:
+                self.game_over = True
+        
+        # Update power-up timer
+        self.powerup_timer -= 1
+        if self.powerup_timer <= 0:
+            # Spawn a power-up
+            powerup_type = self.rng.choice(list(PowerUpType))
+            x = self.rng.randint(50, SCREEN_WIDTH - 50)
+            self.powerups.append(self.powerup_pool.acquire(x, 0, powerup_type))
+            self.powerup_timer = self.rng.randint(FPS * 10, FPS * 20)  # 10-20 seconds
+        
+        # Apply input
+        if inputs.weapon is not None:
+            if self.player.weapons[inputs.weapon].ammo != 0:  # Only switch if ammo available
+                self.player.change_weapon(inputs.weapon)
+        for click_x, click_y, tick_offset in inputs.clicks:
+            new_projectiles = self.player.shoot((click_x, click_y), tick_offset)
+            self.shots_fired += len(new_projectiles)
+            if self.projectile_store is None:  # The store tracks its own projectiles
+                self.projectiles.extend(new_projectiles)
+        timer = self.phase_timer
+        if timer is not None:
+            timer.mark("input")
+        
+        # Update player
+        self.player.update(inputs.mouse_pos)
+        if timer is not None:
+            timer.mark("player")
+        
+        # Update ducks
+        if self.duck_store is not None:
+            self.duck_store.update()
+        else:
+            for duck in self.ducks:
+                duck.update()
+        if timer is not None:
+            timer.mark("ducks")
+        
+        if self.projectile_store is not None:
+            self.update_projectile_store()
+        else:
+            self.update_projectiles()
+        if timer is not None:
+            timer.mark("projectiles")
+        
+        self.update_powerups()
+        if timer is not None:
+            timer.mark("powerups")
     
-    # Timer for game time
-    game_timer = 0
+    def update_projectile_store(self):
+        projectile_store = self.projectile_store
+        duck_store = self.duck_store
+        projectile_store.update()
+        
+        n = projectile_store.count
+        ducks = duck_store.count
+        if n and ducks:
+            paths = (projectile_store.prev_x[:n], projectile_store.prev_y[:n], projectile_store.x[:n],
+                     projectile_store.y[:n], duck_store.prev_x[:ducks], duck_store.prev_y[:ducks],
+                     duck_store.x[:ducks], duck_store.y[:ducks])
+            hits = sweep_projectile_hits(*paths, duck_store.width, duck_store.height)
+            # Removals reorder the stores, so resolve the hits against the views as they are now
+            duck_views = duck_store.views[:ducks]
+            if self.pixel_hits:
+                hits = refine_pixel_hits(hits, *paths, duck_views)
+            self.resolve_hits(hits, projectile_store.views[:n], duck_views, projectile_store.remove)
+        
+        # Remove projectiles that are out of bounds
+        projectile_store.remove_out_of_bounds()
     
-    return player, ducks, projectiles, powerups, ui, powerup_timer, game_timer
+    def update_projectiles(self):
+        projectiles = self.projectiles
+        if not projectiles:
+            return
+        for proj in projectiles:
+            proj.update()
+        
+        ducks = list(self.ducks)
+        hit = set()
+        if ducks:
+            proj_paths = [(proj.prev_x, proj.prev_y, proj.x, proj.y) for proj in projectiles]
+            duck_paths = [(duck.prev_x, duck.prev_y, duck.x, duck.y, duck.width, duck.height) for duck in ducks]
+            if numpy is None:
+                proj_paths, duck_paths = list(zip(*proj_paths)), list(zip(*duck_paths))
+                sweep = sweep_projectile_hits_python
+            else:
+                proj_paths, duck_paths = numpy.array(proj_paths).T, numpy.array(duck_paths).T
+                sweep = sweep_projectile_hits
+            paths = (*proj_paths, *duck_paths[:4])
+            hits = sweep(*paths, duck_paths[4], duck_paths[5])
+            if self.pixel_hits:
+                hits = refine_pixel_hits(hits, *paths, ducks)
+            self.resolve_hits(hits, projectiles, ducks, hit.add)
+        
+        # Compact surviving projectiles to the front of the list as we go
+        kept = 0
+        for proj in projectiles:
+            # Remove projectiles that hit a duck or are out of bounds
+            if proj in hit or proj.is_out_of_bounds():
+                self.projectile_pool.release(proj)
+            else:
+                projectiles[kept] = proj
+                kept += 1
+        del projectiles[kept:]
+    
+    # Apply the hits from sweep_projectile_hits in projectile order: each projectile hits the first
+    # duck on its path that an earlier projectile hasn't killed, and is passed to remove_projectile.
+    # The hit effect is emitted where the path met the duck, at the hit's entry time
+    def resolve_hits(self, hits, projectiles, ducks, remove_projectile):
+        killed = set()
+        start = 0
+        while start < len(hits[0]):
+            end = get_projectile_hits_end(hits, start)
+            for i in range(start, end):
+                duck_index = hits[1][i]
+                if duck_index in killed:
+                    continue
+                proj = projectiles[hits[0][i]]
+                duck = ducks[duck_index]
+                self.hits += 1
+                hit_effect, death_effect = DUCK_PARTICLE_EFFECTS[duck.duck_type]
+                colors = get_duck_colors(duck.duck_type)
+                t = hits[2][i]
+                particles.emit(hit_effect, proj.prev_x + (proj.x - proj.prev_x) * t,
+                               proj.prev_y + (proj.y - proj.prev_y) * t, colors)
+                if duck.hit(proj.damage):
+                    particles.emit(death_effect, duck.x + duck.width / 2, duck.y + duck.height / 2, colors)
+                    killed.add(duck_index)
+                    self.kill_duck(duck)
+                remove_projectile(proj)
+                break
+            start = end
+    
+    def kill_duck(self, duck):
+        self.score += duck.score_value
+        self.ducks_killed += 1
+        self.total_kills += 1
+        self.kills_by_type[duck.duck_type] += 1
+        self.remove_duck(duck)
+        
+        # Check for level up
+        if self.ducks_killed >= self.ducks_needed_for_next_level:
+            self.level += 1
+            self.ducks_killed = 0
+            self.ducks_needed_for_next_level = KILLS_PER_LEVEL * self.level
+            self.time_remaining += LEVEL_TIME_BONUS  # Add time for next level
+            self.level_ticks.append(self.game_timer)
+            
+            # Play level up sound
+            audio.play("level_up")
+            
+            # Spawn new ducks based on new level
+            for i in range(self.get_duck_count()):
+                self.add_duck()
+        else:
+            # Just replace the duck
+            self.add_duck()
+    
+    def update_powerups(self):
+        player = self.player
+        powerups = self.powerups
+        kept = 0
+        for powerup in powerups:
+            powerup.update()
+            
+            # Check for collision with player's crosshair
+            if powerup.get_rect().collidepoint(player.x, player.y):
+                powerup_type, duration = powerup.activate()
+                player.activate_powerup(powerup_type, duration)
+                self.powerup_pool.release(powerup)
+            
+            # Remove power-ups that are out of bounds
+            elif powerup.is_out_of_bounds():
+                self.powerup_pool.release(powerup)
+            
+            else:
+                powerups[kept] = powerup
+                kept += 1
+        del powerups[kept:]
+
+    def get_stats(self):
+        return {
+            "score": self.score,
+            "level": self.level,
+            "kills": self.total_kills,
+            "kills_by_type": {duck_type.name: count for duck_type, count in self.kills_by_type.items()},
+            "shots": self.shots_fired,
+            "hits": self.hits,
+            "accuracy": round(self.hits / self.shots_fired, 4) if self.shots_fired else 0.0,
+            "ticks": self.game_timer,
+            "level_ticks": list(self.level_ticks),
+            "game_over": self.game_over,
+        }
+    
+    # CRC of the simulation state, used to check that a replay reproduced the recorded game exactly
+    # Every value is packed as a double, so 618 and 618.0 (e.g. after a snapshot restore) hash the same
+    def get_checksum(self):
+        state = [self.score, self.level, self.ducks_killed, self.time_remaining, self.game_timer,
+                 self.powerup_timer, len(self.ducks), len(self.projectiles), len(self.powerups)]
+        for duck in self.ducks:
+            state += (duck.duck_type.value, duck.x, duck.y, duck.health)
+        for projectile in self.projectiles:
+            state += (projectile.x, projectile.y)
+        for powerup in self.powerups:
+            state += (powerup.type.value, powerup.y)
+        state += (weapon.ammo for weapon in self.player.weapons.values())
+        return zlib.crc32(struct.pack(f"<{len(state)}d", *state))
+
+    # Serialize the whole simulation state (not assets) to a compact binary buffer
+    def save_snapshot(self):
+        flags = int(self.duck_store is not None) | int(self.game_over) << 1 | int(self.pixel_hits) << 2
+        data = bytearray(struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.difficulty,
+                                     flags, self.seed))
+        data += struct.pack(SNAPSHOT_SESSION, self.score, self.level, self.ducks_killed,
+                            self.ducks_needed_for_next_level, self.time_remaining, self.game_timer,
+                            self.powerup_timer)
+        data += struct.pack(SNAPSHOT_STATS, self.shots_fired, self.hits, self.total_kills,
+                            *(self.kills_by_type[duck_type] for duck_type in DuckType), len(self.level_ticks))
+        data += struct.pack(f"<{len(self.level_ticks)}i", *self.level_ticks)
+        version, mt_state, gauss_next = self.rng.getstate()
+        data += struct.pack(SNAPSHOT_RNG, *mt_state, gauss_next is not None, gauss_next or 0.0)
+        if self.duck_store is not None:
+            state = self.duck_store.rng.bit_generator.state
+            data += struct.pack(SNAPSHOT_NUMPY_RNG, state["state"]["state"].to_bytes(16, "little"),
+                                state["state"]["inc"].to_bytes(16, "little"), bool(state["has_uint32"]),
+                                state["uinteger"])
+        
+        player = self.player
+        data += struct.pack(SNAPSHOT_PLAYER, player.x, player.y, player.current_weapon.type.value,
+                            player.damage_multiplier, player.cooldown_multiplier, len(player.active_powerups))
+        for weapon_type in WeaponType:
+            weapon = player.weapons[weapon_type]
+            data += struct.pack(SNAPSHOT_WEAPON, weapon.cooldown, weapon.max_cooldown, weapon.ammo)
+        for powerup_type, time_left in player.active_powerups.items():
+            data += struct.pack(SNAPSHOT_ACTIVE_POWERUP, powerup_type.value, time_left)
+        
+        data += struct.pack("<3I", len(self.ducks), len(self.projectiles), len(self.powerups))
+        if self.duck_store is not None:
+            # The store arrays are copied as-is; only what lives on the projectile views is packed per entity
+            data += self.duck_store.save_fields()
+            data += self.projectile_store.save_fields()
+            for proj in self.projectiles:
+                data += struct.pack(SNAPSHOT_PROJECTILE_VIEW, proj.weapon.type.value, proj.angle, proj.is_multi_shot)
+        else:
+            for duck in self.ducks:
+                data += struct.pack(SNAPSHOT_DUCK, duck.duck_type.value, duck.x, duck.y, duck.prev_x, duck.prev_y,
+                                    duck.speed_x, duck.speed_y, duck.flap_timer, duck.flap_speed, duck.flap_offset,
+                                    duck.direction, duck.flap_direction, duck.health)
+            for proj in self.projectiles:
+                data += struct.pack(SNAPSHOT_PROJECTILE, proj.weapon.type.value, proj.x, proj.y, proj.prev_x,
+                                    proj.prev_y, proj.dx, proj.dy, proj.angle, proj.damage, proj.is_multi_shot)
+        for powerup in self.powerups:
+            data += struct.pack(SNAPSHOT_POWERUP, powerup.type.value, powerup.x, powerup.y, powerup.prev_y,
+                                powerup.speed_y, powerup.active_time)
+        return bytes(data)
+    
+    # Load a save_snapshot() buffer into this session, reusing its player, weapons and entity pools
+    # The buffer is checked before anything is assigned, so a bad one leaves the session as it was
+    def restore_snapshot(self, data):
+        magic, version, difficulty, flags, seed = struct.unpack_from(SNAPSHOT_HEADER, data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Not a version {SNAPSHOT_VERSION} Duck Shooter snapshot")
+        if bool(flags & 1) != (self.duck_store is not None):
+            raise ValueError("Snapshot and session disagree on use_entity_store")
+        if len(data) != get_snapshot_size(data):
+            raise ValueError("Snapshot is truncated or has trailing data")
+        self.difficulty, self.seed = difficulty, seed
+        self.game_over = bool(flags & 2)
+        self.pixel_hits = bool(flags & 4)
+        offset = struct.calcsize(SNAPSHOT_HEADER)
+        (self.score, self.level, self.ducks_killed, self.ducks_needed_for_next_level, self.time_remaining,
+         self.game_timer, self.powerup_timer) = struct.unpack_from(SNAPSHOT_SESSION, data, offset)
+        offset += struct.calcsize(SNAPSHOT_SESSION)
+        self.shots_fired, self.hits, self.total_kills, *kills, level_count = struct.unpack_from(SNAPSHOT_STATS, data,
+                                                                                                offset)
+        self.kills_by_type = dict(zip(DuckType, kills))
+        offset += struct.calcsize(SNAPSHOT_STATS)
+        self.level_ticks = list(struct.unpack_from(f"<{level_count}i", data, offset))
+        offset += struct.calcsize(f"<{level_count}i")
+        rng_state = struct.unpack_from(SNAPSHOT_RNG, data, offset)
+        offset += struct.calcsize(SNAPSHOT_RNG)
+        numpy_rng_state = None
+        if self.duck_store is not None:
+            numpy_rng_state = struct.unpack_from(SNAPSHOT_NUMPY_RNG, data, offset)
+            offset += struct.calcsize(SNAPSHOT_NUMPY_RNG)
+        
+        player = self.player
+        player.x, player.y, weapon_value, player.damage_multiplier, player.cooldown_multiplier, powerup_count = \
+            struct.unpack_from(SNAPSHOT_PLAYER, data, offset)
+        offset += struct.calcsize(SNAPSHOT_PLAYER)
+        player.current_weapon = player.weapons[WeaponType(weapon_value)]
+        for weapon_type in WeaponType:
+            weapon = player.weapons[weapon_type]
+            weapon.cooldown, weapon.max_cooldown, weapon.ammo = struct.unpack_from(SNAPSHOT_WEAPON, data, offset)
+            offset += struct.calcsize(SNAPSHOT_WEAPON)
+        player.active_powerups = {}
+        for i in range(powerup_count):
+            powerup_value, time_left = struct.unpack_from(SNAPSHOT_ACTIVE_POWERUP, data, offset)
+            offset += struct.calcsize(SNAPSHOT_ACTIVE_POWERUP)
+            player.active_powerups[PowerUpType(powerup_value)] = time_left
+        
+        duck_count, projectile_count, powerup_count = struct.unpack_from("<3I", data, offset)
+        offset += struct.calcsize("<3I")
+        
+        # Hand the current entities back to their pools before rebuilding from the snapshot
+        if self.duck_store is None:
+            for duck in self.ducks:
+                duck.index = -1
+                self.duck_pool.release(duck)
+            self.ducks.clear()
+            for proj in self.projectiles:
+                self.projectile_pool.release(proj)
+            self.projectiles.clear()
+        for powerup in self.powerups:
+            self.powerup_pool.release(powerup)
+        self.powerups.clear()
+        
+        if self.duck_store is not None:
+            # Load the arrays directly and attach views to them; nothing is respawned or written field by field
+            offset = self.duck_store.load_fields(data, offset, duck_count)
+            self.duck_store.attach_views()
+            store = self.projectile_store
+            store.clear()
+            offset = store.load_fields(data, offset, projectile_count)
+            for index, (weapon_value, angle, is_multi_shot) in enumerate(struct.iter_unpack(
+                    SNAPSHOT_PROJECTILE_VIEW,
+                    data[offset:offset + projectile_count * struct.calcsize(SNAPSHOT_PROJECTILE_VIEW)])):
+                weapon = player.weapons[WeaponType(weapon_value)]
+                store.views.append(ProjectileView.attach(store, index, weapon, angle, is_multi_shot))
+            offset += projectile_count * struct.calcsize(SNAPSHOT_PROJECTILE_VIEW)
+        else:
+            for duck_type, *fields in struct.iter_unpack(SNAPSHOT_DUCK, data[offset:offset + duck_count *
+                                                                            struct.calcsize(SNAPSHOT_DUCK)]):
+                duck = self.add_duck(DuckType(duck_type))
+                (duck.x, duck.y, duck.prev_x, duck.prev_y, duck.speed_x, duck.speed_y, duck.flap_timer,
+                 duck.flap_speed, duck.flap_offset, duck.direction, duck.flap_direction, duck.health) = fields
+            offset += duck_count * struct.calcsize(SNAPSHOT_DUCK)
+            
+            for weapon_value, x, y, prev_x, prev_y, dx, dy, angle, damage, is_multi_shot in struct.iter_unpack(
+                    SNAPSHOT_PROJECTILE, data[offset:offset + projectile_count * struct.calcsize(SNAPSHOT_PROJECTILE)]):
+                weapon = player.weapons[WeaponType(weapon_value)]
+                proj = player.projectile_factory(x, y, x + dx, y + dy, weapon)
+                proj.prev_x, proj.prev_y, proj.dx, proj.dy, proj.damage = prev_x, prev_y, dx, dy, damage
+                proj.is_multi_shot = is_multi_shot
+                if proj.angle != angle:
+                    proj.angle = angle
+                    proj.rotated_image, proj.draw_offset = get_rotated_projectile(weapon, angle)
+                self.projectiles.append(proj)
+            offset += projectile_count * struct.calcsize(SNAPSHOT_PROJECTILE)
+        
+        for powerup_value, x, y, prev_y, speed_y, active_time in struct.iter_unpack(
+                SNAPSHOT_POWERUP, data[offset:offset + powerup_count * struct.calcsize(SNAPSHOT_POWERUP)]):
+            powerup = self.powerup_pool.acquire(x, y, PowerUpType(powerup_value))
+            powerup.prev_y, powerup.speed_y, powerup.active_time = prev_y, speed_y, active_time
+            self.powerups.append(powerup)
+        
+        # Respawning restored list-mode ducks drew from the generators, so restore them last
+        self.rng.setstate((3, rng_state[:625], rng_state[626] if rng_state[625] else None))
+        if numpy_rng_state is not None:
+            state, inc, has_uint32, uinteger = numpy_rng_state
+            self.duck_store.rng.bit_generator.state = {
+                "bit_generator": "PCG64",
+                "state": {"state": int.from_bytes(state, "little"), "inc": int.from_bytes(inc, "little")},
+                "has_uint32": int(has_uint32),
+                "uinteger": uinteger,
+            }
+
+def write_varint(data, value):
+    while value >= 0x80:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+# Signed deltas are zigzag encoded so small moves either way fit in one varint byte
+def write_signed_varint(data, value):
+    write_varint(data, value * 2 if value >= 0 else -value * 2 - 1)
+
+def read_signed_varint(data, offset):
+    value, offset = read_varint(data, offset)
+    return (value >> 1 if value % 2 == 0 else -(value >> 1) - 1), offset
+
+# Logs every TickInput a session steps with as a compact binary replay
+# Each record holds the ticks skipped since the last change, then only the fields that changed:
+# mouse movement as a delta, clicks relative to the crosshair with their offset into the tick and the new weapon
+class InputRecorder:
+    def __init__(self, session):
+        self.data = bytearray(struct.pack(REPLAY_HEADER, REPLAY_MAGIC, REPLAY_VERSION, session.seed,
+                                          session.difficulty,
+                                          int(session.use_entity_store) | int(session.pixel_hits) << 1))
+        self.mouse_pos = (0, 0)
+        self.idle_ticks = 0
+    
+    def record(self, inputs):
+        mouse_x, mouse_y = int(inputs.mouse_pos[0]), int(inputs.mouse_pos[1])
+        flags = 0
+        if (mouse_x, mouse_y) != self.mouse_pos:
+            flags |= REPLAY_MOUSE
+        if inputs.clicks:
+            flags |= REPLAY_CLICKS
+        if inputs.weapon is not None:
+            flags |= REPLAY_WEAPON
+        if flags == 0:
+            self.idle_ticks += 1
+            return
+        
+        data = self.data
+        write_varint(data, self.idle_ticks)
+        data.append(flags)
+        self.idle_ticks = 0
+        if flags & REPLAY_MOUSE:
+            write_signed_varint(data, mouse_x - self.mouse_pos[0])
+            write_signed_varint(data, mouse_y - self.mouse_pos[1])
+            self.mouse_pos = (mouse_x, mouse_y)
+        if flags & REPLAY_CLICKS:
+            write_varint(data, len(inputs.clicks))
+            for click_x, click_y, tick_offset in inputs.clicks:
+                write_signed_varint(data, int(click_x) - mouse_x)
+                write_signed_varint(data, int(click_y) - mouse_y)
+                data.append(round(tick_offset * CLICK_OFFSET_STEPS))
+        if flags & REPLAY_WEAPON:
+            data.append(inputs.weapon.value)
+    
+    # Close the log with the final score and state checksum so replays can be verified
+    def finish(self, session):
+        write_varint(self.data, self.idle_ticks)
+        self.data.append(REPLAY_END)
+        write_varint(self.data, session.score)
+        self.data += struct.pack("<I", session.get_checksum())
+        self.idle_ticks = 0
+
+# Re-simulates a recorded game headlessly from its seed and input log
+class ReplayPlayer:
+    def __init__(self, data):
+        magic, version, self.seed, self.difficulty, flags = struct.unpack_from(REPLAY_HEADER, data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"Not a version {REPLAY_VERSION} Duck Shooter replay")
+        self.use_entity_store = bool(flags & 1)
+        self.pixel_hits = bool(flags & 2)
+        self.final_score = None
+        self.final_checksum = None
+        self.inputs = self.decode(data, struct.calcsize(REPLAY_HEADER))
+        self.restart()
+    
+    def decode(self, data, offset):
+        inputs = []
+        mouse_pos = (0, 0)
+        while offset < len(data):
+            idle_ticks, offset = read_varint(data, offset)
+            inputs.extend(TickInput(mouse_pos) for i in range(idle_ticks))
+            flags = data[offset]
+            offset += 1
+            if flags & REPLAY_END:
+                self.final_score, offset = read_varint(data, offset)
+                self.final_checksum, = struct.unpack_from("<I", data, offset)
+                break
+            
+            if flags & REPLAY_MOUSE:
+                dx, offset = read_signed_varint(data, offset)
+                dy, offset = read_signed_varint(data, offset)
+                mouse_pos = (mouse_pos[0] + dx, mouse_pos[1] + dy)
+            clicks = []
+            if flags & REPLAY_CLICKS:
+                count, offset = read_varint(data, offset)
+                for i in range(count):
+                    dx, offset = read_signed_varint(data, offset)
+                    dy, offset = read_signed_varint(data, offset)
+                    clicks.append((mouse_pos[0] + dx, mouse_pos[1] + dy, data[offset] / CLICK_OFFSET_STEPS))
+                    offset += 1
+            weapon = None
+            if flags & REPLAY_WEAPON:
+                weapon = WeaponType(data[offset])
+                offset += 1
+            inputs.append(TickInput(mouse_pos, clicks, weapon))
+        return inputs
+    
+    def restart(self):
+        self.session = GameSession(self.difficulty, self.use_entity_store, self.seed, self.pixel_hits)
+        self.tick = 0
+        self.checkpoints = {}  # Tick -> session snapshot, taken every REPLAY_CHECKPOINT_INTERVAL ticks
+    
+    # Step as fast as possible up to the given tick (default: the end of the recording)
+    def run(self, until=None):
+        stop = len(self.inputs) if until is None else min(until, len(self.inputs))
+        session = self.session
+        inputs = self.inputs
+        while self.tick < stop:
+            if self.tick % REPLAY_CHECKPOINT_INTERVAL == 0 and self.tick not in self.checkpoints:
+                self.checkpoints[self.tick] = session.save_snapshot()
+            session.step(inputs[self.tick])
+            self.tick += 1
+        return session
+    
+    # Jump to a tick; going backwards restores the nearest earlier checkpoint and re-simulates from there
+    def seek(self, tick):
+        if tick < self.tick:
+            checkpoint = max(checkpoint for checkpoint in self.checkpoints if checkpoint <= tick)
+            self.session.restore_snapshot(self.checkpoints[checkpoint])
+            self.tick = checkpoint
+        return self.run(tick)
+    
+    # Whether the finished replay ended in exactly the recorded state
+    def matches_recording(self):
+        return (self.final_checksum is None or
+                (self.session.score == self.final_score and self.session.get_checksum() == self.final_checksum))
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        return ReplayPlayer(f.read())
+
+# Simulated shooter for headless runs; turns the session state into one TickInput per tick
+class Bot:
+    def __init__(self, rng):
+        self.rng = rng
+        self.mouse_pos = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+    
+    # Point to shoot at this tick, or None to hold fire
+    def get_target(self, session):
+        raise NotImplementedError
+    
+    # Switch away from an empty weapon to the one with the most ammo left
+    def choose_weapon(self, player):
+        if player.current_weapon.ammo != 0:
+            return None
+        weapon = max(player.weapons.values(), key=lambda weapon: math.inf if weapon.ammo < 0 else weapon.ammo)
+        return weapon.type if weapon.ammo != 0 else None
+    
+    def get_input(self, session):
+        player = session.player
+        weapon = self.choose_weapon(player)
+        target = self.get_target(session)
+        clicks = []
+        if target is not None:
+            self.mouse_pos = (int(target[0]), int(target[1]))
+            if weapon is None and player.current_weapon.can_shoot():
+                clicks.append(self.mouse_pos)
+        return TickInput(self.mouse_pos, clicks, weapon)
+    
+    def get_nearest_duck(self, session):
+        mouse_x, mouse_y = self.mouse_pos
+        return min(session.ducks, default=None,
+                   key=lambda duck: (duck.x + duck.width / 2 - mouse_x) ** 2 + (duck.y + duck.height / 2 - mouse_y) ** 2)
+
+# Clicks at random points in the sky
+class RandomBot(Bot):
+    click_chance = 0.1  # Per tick
+    
+    def get_target(self, session):
+        if self.rng.random() < self.click_chance:
+            return self.rng.randint(0, SCREEN_WIDTH), self.rng.randint(50, SCREEN_HEIGHT - 150)
+        return None
+
+# Tracks the duck nearest the crosshair and shoots at where it is now
+class GreedyBot(Bot):
+    def get_target(self, session):
+        duck = self.get_nearest_duck(session)
+        if duck is None:
+            return None
+        return duck.x + duck.width / 2, duck.y + duck.height / 2
+
+# Tracks the duck nearest the crosshair and leads the shot to where the projectile will meet it
+class LeadingBot(Bot):
+    def get_target(self, session):
+        duck = self.get_nearest_duck(session)
+        if duck is None:
+            return None
+        
+        # The shot leaves this tick and moves in step with the duck
+        speed_x, speed_y = duck.speed_x, duck.speed_y
+        x = duck.x + duck.width / 2
+        y = duck.y + duck.height / 2
+        origin_x, origin_y = PROJECTILE_ORIGIN
+        dx, dy = x - origin_x, y - origin_y
+        
+        # Earliest t >= 0 with |duck(t) - origin| = projectile speed * t
+        speed = session.player.current_weapon.projectile_speed
+        a = speed_x * speed_x + speed_y * speed_y - speed * speed
+        b = 2 * (dx * speed_x + dy * speed_y)
+        c = dx * dx + dy * dy
+        if abs(a) < 1e-9:
+            t = -c / b if b < 0 else 0.0
+        else:
+            discriminant = b * b - 4 * a * c
+            if discriminant < 0:
+                return x, y  # Can't catch it; aim at it anyway
+            roots = [(-b - math.sqrt(discriminant)) / (2 * a), (-b + math.sqrt(discriminant)) / (2 * a)]
+            t = min((root for root in roots if root >= 0), default=0.0)
+        return x + speed_x * t, y + speed_y * t
+
+BOTS = {"random": RandomBot, "greedy": GreedyBot, "leading": LeadingBot}
+
+# Play one game with a bot and no window; stops at game over, after max_level or after max_ticks
+def run_bot_game(bot_name, difficulty=1, seed=None, max_level=None, max_ticks=None, use_entity_store=False):
+    session = GameSession(difficulty, use_entity_store, seed)
+    bot = BOTS[bot_name](random.Random(session.seed))
+    start = time.perf_counter()
+    while (not session.game_over and (max_ticks is None or session.game_timer < max_ticks) and
+           (max_level is None or session.level <= max_level)):
+        session.step(bot.get_input(session))
+    elapsed = time.perf_counter() - start
+    
+    stats = {"bot": bot_name, "difficulty": difficulty, "seed": session.seed}
+    stats.update(session.get_stats())
+    stats["ticks_per_sec"] = round(session.game_timer / max(elapsed, 1e-9), 1)
+    return stats
+
+# Draws a GameSession onto a surface; only used when running interactively
+# In dirty-rect mode only the areas entities moved through are restored from the background and pushed
+class GameRenderer:
+    def __init__(self, surface, ui, dirty_rects=DIRTY_RECT_RENDERING, parallax=PARALLAX_BACKGROUND):
+        self.surface = surface
+        self.ui = ui
+        self.dirty_rects = dirty_rects
+        self.parallax = parallax
+        # With parallax the background changes, so entities are erased from a private copy
+        self.background = ui.background.copy() if parallax else ui.background
+        self.cloud_offset = None  # Scroll position painted into the copy; None until the first frame
+        self.previous_rects = []  # Entity rects drawn last frame
+        self.update_rects = None  # Rects to push in present(); None pushes the whole window
+        self.hud_state = None
+        self.full_redraw = True
+        self.phase_timer = None  # Optional PhaseTimer for profiling draw() and present()
+    
+    # Force the next frame to redraw the whole window, e.g. after a menu covered it
+    def invalidate(self):
+        self.full_redraw = True
+    
+    def get_hud_state(self, session):
+        player = session.player
+        return (session.score, session.level, session.ducks_killed, session.ducks_needed_for_next_level,
+                session.time_remaining, player.current_weapon.type,
+                tuple(weapon.ammo for weapon in player.weapons.values()))
+    
+    def draw_entities(self, session, alpha, crosshair_pos):
+        surface = self.surface
+        rects = []
+        if session.duck_store is not None:
+            session.duck_store.draw(surface, alpha)
+        else:
+            for duck in session.ducks:
+                rects.append(duck.draw(surface, alpha))
+        for proj in session.projectiles:
+            rects.append(proj.draw(surface, alpha))
+        rects.extend(particles.draw(surface, alpha, particles.used <= DIRTY_RECT_MAX_ENTITIES))
+        for powerup in session.powerups:
+            rects.append(powerup.draw(surface, alpha))
+        
+        # Draw player
+        rects.extend(session.player.draw(surface, crosshair_pos))
+        return rects
+    
+    def draw_hud(self, session):
+        self.ui.draw_hud(self.surface, session.score, session.player, session.level, session.ducks_killed,
+                         session.ducks_needed_for_next_level, session.time_remaining)
+    
+    # Scroll the clouds of the private background copy; returns the repainted strip, or None if they didn't move
+    def update_parallax(self, session):
+        offset = session.game_timer * PARALLAX_CLOUD_SPEED // FPS % SCREEN_WIDTH
+        if offset == self.cloud_offset:
+            return None
+        self.cloud_offset = offset
+        return self.ui.background_layers.draw_clouds(self.background, offset)
+    
+    # alpha interpolates entity positions between the last two simulation ticks
+    # crosshair_pos draws the crosshair at the latest mouse position instead of the one from the last tick
+    def draw(self, session, alpha=1.0, crosshair_pos=None):
+        entity_count = len(session.ducks) + len(session.projectiles) + len(session.powerups) + particles.used
+        if (self.full_redraw or not self.dirty_rects or session.duck_store is not None or
+                entity_count > DIRTY_RECT_MAX_ENTITIES):
+            self.draw_full(session, alpha, crosshair_pos)
+        else:
+            self.draw_dirty(session, alpha, crosshair_pos)
+    
+    def draw_full(self, session, alpha, crosshair_pos):
+        timer = self.phase_timer
+        
+        # Draw background
+        if self.parallax:
+            self.update_parallax(session)
+        self.surface.blit(self.background, (0, 0))
+        if timer is not None:
+            timer.mark("draw_background")
+        
+        self.previous_rects = self.draw_entities(session, alpha, crosshair_pos)
+        if timer is not None:
+            timer.mark("draw_entities")
+        
+        # Draw UI
+        self.draw_hud(session)
+        if timer is not None:
+            timer.mark("draw_hud")
+        self.hud_state = self.get_hud_state(session)
+        self.update_rects = None
+        # Store-drawn ducks and large particle counts are not tracked
+        self.full_redraw = session.duck_store is not None or particles.used > DIRTY_RECT_MAX_ENTITIES
+    
+    def draw_dirty(self, session, alpha, crosshair_pos):
+        surface = self.surface
+        background = self.background
+        
+        timer = self.phase_timer
+        
+        # Erase last frame's entities
+        previous_rects = self.previous_rects
+        for rect in previous_rects:
+            surface.blit(background, rect, rect)
+        cloud_band = self.update_parallax(session) if self.parallax else None
+        if cloud_band is not None:
+            surface.blit(background, cloud_band, cloud_band)
+        if timer is not None:
+            timer.mark("draw_background")
+        
+        rects = self.draw_entities(session, alpha, crosshair_pos)
+        update_rects = previous_rects + rects
+        if cloud_band is not None:
+            update_rects.append(cloud_band)
+        if timer is not None:
+            timer.mark("draw_entities")
+        
+        # Redraw the HUD on top when its values changed or an entity touched it
+        hud_rects = self.ui.hud_rects
+        hud_state = self.get_hud_state(session)
+        if hud_state != self.hud_state or any(rect.collidelist(hud_rects) != -1 for rect in update_rects):
+            self.draw_hud(session)
+            self.hud_state = hud_state
+            update_rects.extend(hud_rects)
+        if timer is not None:
+            timer.mark("draw_hud")
+        
+        self.previous_rects = rects
+        self.update_rects = update_rects
+    
+    # Push the last drawn frame to the window
+    def present(self):
+        if self.update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.update_rects)
+        if self.phase_timer is not None:
+            self.phase_timer.mark("present")
+
+# Create the game window
+def create_window():
+    global screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Duck Shooter")
+    return screen
+
+# SQLite leaderboard of every finished run
+# WAL mode lets the indexed top-N reads run while the background thread commits new runs,
+# and every batch is its own transaction so a crash loses at most the runs still queued
+class HighScoreStore:
+    def __init__(self, path=HIGH_SCORE_DB):
+        self.path = path
+        self.connection = self.connect()
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                score INTEGER NOT NULL,
+                difficulty INTEGER NOT NULL,
+                level INTEGER NOT NULL,
+                ducks_killed INTEGER NOT NULL,
+                played_at REAL NOT NULL
+            )""")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS runs_by_difficulty_score ON runs (difficulty, score DESC)")
+        # Leaderboards made by earlier versions carry an index for per-level boards, which nothing reads
+        self.connection.execute("DROP INDEX IF EXISTS runs_by_difficulty_level_score")
+        self.connection.commit()
+        
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_loop, name="high-score-writer", daemon=True)
+        self.writer.start()
+    
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    # Queue a finished run; never blocks on disk
+    def record(self, score, difficulty, level, ducks_killed):
+        self.pending.put((score, difficulty, level, ducks_killed, time.time()))
+    
+    # Best runs for a difficulty, served by the (difficulty, score) index
+    def top(self, difficulty, count=HIGH_SCORE_COUNT):
+        rows = self.connection.execute(
+            "SELECT score, level FROM runs WHERE difficulty = ? ORDER BY score DESC LIMIT ?", (difficulty, count))
+        return rows.fetchall()
+    
+    def write_loop(self):
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [run for run in batch if run is not None]
+            if batch:
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO runs (score, difficulty, level, ducks_killed, played_at) "
+                            "VALUES (?, ?, ?, ?, ?)", batch)
+                except sqlite3.Error as e:
+                    print(f"Could not save high scores: {e}")
+        connection.close()
+    
+    # Flush queued runs and stop the writer
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        self.connection.close()
+
+# Open the leaderboard, falling back to an in-memory table for this run if the file can't be used
+def open_high_score_store():
+    global high_score_store
+    try:
+        high_score_store = HighScoreStore()
+    except sqlite3.Error as e:
+        print(f"Could not open high score database: {e}")
+        high_score_store = None
+
+# Top scores for a difficulty, cached so screens never wait on the database
+def get_high_scores(difficulty):
+    if difficulty not in high_scores:
+        rows = []
+        if high_score_store is not None:
+            try:
+                rows = high_score_store.top(difficulty)
+            except sqlite3.Error as e:
+                print(f"Could not read high scores: {e}")
+        high_scores[difficulty] = rows
+    return high_scores[difficulty]
+
+# Add a finished game to the leaderboard and the cached top scores
+def record_high_score(session):
+    if high_score_store is not None:
+        high_score_store.record(session.score, session.difficulty, session.level, session.total_kills)
+    scores = get_high_scores(session.difficulty) + [(session.score, session.level)]
+    scores.sort(key=lambda row: row[0], reverse=True)
+    high_scores[session.difficulty] = scores[:HIGH_SCORE_COUNT]
+
+# Write a finished session's input log to REPLAY_DIR
+def save_replay(session):
+    session.recorder.finish(session)
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    path = os.path.join(REPLAY_DIR, f"replay_{time.strftime('%Y%m%d_%H%M%S')}_{session.seed}.dsr")
+    with open(path, "wb") as f:
+        f.write(session.recorder.data)
+    return path
+
+# Find the table, key and field index a weapon.<TYPE>.<field> or duck.<TYPE>.<field> parameter refers to
+def get_balance_table_entry(name):
+    parts = name.split(".")
+    try:
+        if len(parts) == 3 and parts[0] == "weapon":
+            return WEAPON_STATS, WeaponType[parts[1]], WEAPON_STAT_FIELDS.index(parts[2])
+        if len(parts) == 3 and parts[0] == "duck":
+            return DUCK_STATS, DuckType[parts[1]], DUCK_STAT_FIELDS.index(parts[2])
+    except (KeyError, ValueError):
+        pass
+    raise ValueError(f"Unknown balance parameter {name!r}")
+
+def get_balance_parameter(name):
+    if name in BALANCE_SETTINGS:
+        return globals()[BALANCE_SETTINGS[name]]
+    table, key, field = get_balance_table_entry(name)
+    return table[key][field]
+
+# Change a balance parameter for games started afterwards in this process
+def set_balance_parameter(name, value):
+    if name in BALANCE_SETTINGS:
+        globals()[BALANCE_SETTINGS[name]] = value
+        return
+    table, key, field = get_balance_table_entry(name)
+    stats = list(table[key])
+    stats[field] = value
+    table[key] = tuple(stats)
+
+# Worker task: play bot games under one parameter set, then put the defaults back for the next task
+def run_balance_chunk(params, bot_name, difficulty, seeds, max_level, max_ticks):
+    defaults = [(name, get_balance_parameter(name)) for name, value in params]
+    try:
+        for name, value in params:
+            set_balance_parameter(name, value)
+        return [run_bot_game(bot_name, difficulty, seed, max_level, max_ticks) for seed in seeds]
+    finally:
+        for name, value in defaults:
+            set_balance_parameter(name, value)
+
+# Fold the per-game stats of one parameter set into a report entry
+def summarize_balance_games(params, games):
+    count = len(games)
+    levels = [game["level"] for game in games]
+    
+    # Ticks each level took, over the games that cleared it
+    clear_ticks = {}
+    for game in games:
+        previous = 0
+        for level, tick in enumerate(game["level_ticks"], start=1):
+            clear_ticks.setdefault(level, []).append(tick - previous)
+            previous = tick
+    
+    kills_by_type = {duck_type.name: sum(game["kills_by_type"][duck_type.name] for game in games)
+                     for duck_type in DuckType}
+    total_kills = sum(kills_by_type.values())
+    shots = sum(game["shots"] for game in games)
+    ticks = sum(game["ticks"] for game in games)
+    busy_seconds = sum(game["ticks"] / game["ticks_per_sec"] for game in games if game["ticks_per_sec"])
+    return {
+        "params": dict(params),
+        "games": count,
+        "mean_score": round(sum(game["score"] for game in games) / count, 2),
+        "mean_level": round(sum(levels) / count, 3),
+        "max_level": max(levels),
+        "level_distribution": {str(level): levels.count(level) for level in sorted(set(levels))},
+        "clear_rate": {str(level): round(len(times) / count, 4) for level, times in sorted(clear_ticks.items())},
+        "mean_seconds_to_clear": {str(level): round(sum(times) / len(times) / FPS, 2)
+                                  for level, times in sorted(clear_ticks.items())},
+        "kills_by_type": kills_by_type,
+        "kill_share": {name: round(kills / total_kills, 4) if total_kills else 0.0
+                       for name, kills in kills_by_type.items()},
+        "accuracy": round(sum(game["hits"] for game in games) / shots, 4) if shots else 0.0,
+        "ticks_per_sec": round(ticks / busy_seconds, 1) if busy_seconds else 0.0,
+    }
+
+# Turn NAME=V1,V2,... sweep arguments into every combination of (name, value) pairs
+def parse_balance_sweeps(sweeps):
+    names = []
+    value_lists = []
+    for sweep in sweeps:
+        name, _, values = sweep.partition("=")
+        get_balance_parameter(name)  # Reject unknown names before starting any workers
+        names.append(name)
+        value_lists.append([float(value) if "." in value else int(value) for value in values.split(",")])
+    return [list(zip(names, values)) for values in itertools.product(*value_lists)]
+
+# Play games for every point of a parameter grid across all cores and write one aggregated report
+# Every parameter set plays the same seeds, so differences come from the parameters, not luck
+def run_balance(sweeps, bot_name, games=100, difficulty=1, seed=None, max_level=None, max_ticks=None,
+                workers=None, report_path=BALANCE_REPORT_PATH):
+    grid = parse_balance_sweeps(sweeps)
+    if seed is None:
+        seed = random.getrandbits(31)
+    start = time.perf_counter()
+    results = [[] for params in grid]
+    # Workers start as fresh interpreters rather than forks of a process that may have SDL threads running
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for index, params in enumerate(grid):
+            for first in range(0, games, BALANCE_CHUNK_GAMES):
+                seeds = [seed + game for game in range(first, min(games, first + BALANCE_CHUNK_GAMES))]
+                future = executor.submit(run_balance_chunk, params, bot_name, difficulty, seeds, max_level, max_ticks)
+                futures[future] = index
+        for future in as_completed(futures):
+            results[futures[future]].extend(future.result())
+    elapsed = time.perf_counter() - start
+    
+    report = {
+        "bot": bot_name,
+        "difficulty": difficulty,
+        "seed": seed,
+        "games_per_config": games,
+        "max_level": max_level,
+        "max_ticks": max_ticks,
+        "elapsed_sec": round(elapsed, 2),
+        "configs": [summarize_balance_games(params, games_stats) for params, games_stats in zip(grid, results)],
+    }
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    for config in report["configs"]:
+        params = " ".join(f"{name}={value}" for name, value in config["params"].items()) or "defaults"
+        print(f"{params:40s} score {config['mean_score']:>8.1f}  level {config['mean_level']:>6.2f}  "
+              f"accuracy {config['accuracy']:.3f}  kills {config['kill_share']}")
+    print(f"{len(grid) * games} games in {elapsed:.1f}s; report written to {report_path}")
+    return 0
+
+# Play games with bots and no window, writing one JSON line of stats per game
+def run_headless(bot_name, games=1, difficulty=1, seed=None, max_level=None, max_ticks=None,
+                 use_entity_store=False, output=None):
+    out = sys.stdout if output is None else open(output, "w")
+    try:
+        for game in range(games):
+            stats = run_bot_game(bot_name, difficulty, None if seed is None else seed + game, max_level, max_ticks,
+                                 use_entity_store)
+            stats["game"] = game
+            out.write(json.dumps(stats) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+# Re-simulate a replay file without a window and report the result
+def run_replay(path, seek=None):
+    try:
+        player = load_replay(path)
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        # Unreadable, not a replay of this version, or truncated
+        print(f"Could not load replay {path}: {e}")
+        return 1
+    start = time.perf_counter()
+    session = player.seek(seek) if seek is not None else player.run()
+    elapsed = time.perf_counter() - start
+    print(f"tick {player.tick}/{len(player.inputs)}  score {session.score}  level {session.level}  "
+          f"ducks killed {session.ducks_killed}  ({player.tick / max(elapsed, 1e-9):.0f} ticks/s)")
+    if seek is None:
+        if player.final_checksum is None:
+            print("Replay has no end record to verify against; the file is truncated")
+            return 1
+        if not player.matches_recording():
+            print(f"Replay diverged: recorded score {player.final_score}, replayed {session.score}")
+            return 1
+        print("Replay matches the recorded game")
+    return 0
+
+# Replace a file in one step so a crash mid-write never leaves it truncated
+def write_file_atomic(path, data):
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not write {path}: {e}")
+
+quick_resume_writer = None  # Thread writing the latest quick-resume snapshot
+
+# Snapshot the running game so it can be resumed after a crash; the write happens off the frame loop
+def save_quick_resume(session):
+    global quick_resume_writer
+    if quick_resume_writer is not None:
+        quick_resume_writer.join()
+    quick_resume_writer = threading.Thread(target=write_file_atomic,
+                                           args=(QUICK_RESUME_PATH, session.save_snapshot()), daemon=True)
+    quick_resume_writer.start()
+
+# Forget the quick-resume snapshot once its game has ended normally
+def clear_quick_resume():
+    global quick_resume_writer
+    if quick_resume_writer is not None:
+        quick_resume_writer.join()
+        quick_resume_writer = None
+    if os.path.exists(QUICK_RESUME_PATH):
+        os.remove(QUICK_RESUME_PATH)
+
+# Restore an interrupted game into session; returns whether there was one
+def load_quick_resume(session):
+    if not os.path.exists(QUICK_RESUME_PATH):
+        return False
+    try:
+        with open(QUICK_RESUME_PATH, "rb") as f:
+            session.restore_snapshot(f.read())
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not resume the previous game: {e}")
+        clear_quick_resume()
+        return False
+    return True
+
+# Block until input arrives or the timeout passes, then return every pending event
+def wait_for_events(timeout):
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+# Mouse input of the playing screen, gathered between simulation ticks
+# Motion bursts from high-rate mice collapse to the latest position, while every click keeps
+# its own position and the time it was read so it lands in the tick it happened in
+class InputCollector:
+    def __init__(self):
+        self.mouse_pos = pygame.mouse.get_pos()
+        self.clicks = []  # (x, y, perf_counter time) not yet handed to a tick
+        self.weapon = None
+        self.last_poll = time.perf_counter()  # When the previous batch of events was taken
+    
+    # Only let the event types the game handles into the queue
+    def setup(self):
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(INPUT_EVENT_TYPES)
+    
+    # Drop input left from before a screen change; motion on other screens wasn't collected
+    def clear(self):
+        self.mouse_pos = pygame.mouse.get_pos()
+        self.clicks = []
+        self.weapon = None
+        self.last_poll = time.perf_counter()
+    
+    # Take the mouse events out of a batch polled at perf_counter time now and return the rest for the caller
+    # Events carry no timestamp, so the batch's clicks are spread over the time since the previous poll,
+    # the first at the previous poll; that time is already covered by this frame's ticks
+    def collect(self, events, ui, now):
+        other_events = []
+        batch = []
+        for event in events:
+            if event.type == pygame.MOUSEMOTION:
+                self.mouse_pos = event.pos
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.mouse_pos = event.pos
+                # Check if weapon button was clicked
+                weapon_type = ui.check_weapon_button_click(event.pos)
+                if weapon_type is not None:
+                    self.weapon = weapon_type
+                else:
+                    batch.append(event.pos)
+            else:
+                other_events.append(event)
+        interval = max(now - self.last_poll, 0.0)
+        for i, (click_x, click_y) in enumerate(batch):
+            self.clicks.append((click_x, click_y, self.last_poll + interval * i / len(batch)))
+        self.last_poll = now
+        return other_events
+    
+    # Input for the tick covering real time tick_start to tick_start + TICK_TIME
+    # Later clicks wait for the tick that covers them; earlier ones (after a dropped backlog) happen at its start
+    def get_tick_input(self, tick_start):
+        clicks = []
+        waiting = []
+        tick_end = tick_start + TICK_TIME
+        for click_x, click_y, stamp in self.clicks:
+            if stamp < tick_end:
+                tick_offset = max((stamp - tick_start) / TICK_TIME, 0.0)
+                steps = min(int(tick_offset * CLICK_OFFSET_STEPS), CLICK_OFFSET_STEPS - 1)
+                clicks.append((click_x, click_y, steps / CLICK_OFFSET_STEPS))
+            else:
+                waiting.append((click_x, click_y, stamp))
+        self.clicks = waiting
+        inputs = TickInput(self.mouse_pos, clicks, self.weapon)
+        self.weapon = None
+        return inputs
+
+# Game initialization
+# Passing the current ui and renderer makes a warm restart that only builds a new session
+def init_game(ui=None, renderer=None):
+    global game_state
+    
+    game_state = GameState.PLAYING
+    session = GameSession(difficulty)
+    particles.clear()
+    if RECORD_REPLAYS:
+        session.recorder = InputRecorder(session)
+    if ui is None:
+        ui = UI()
+        renderer = GameRenderer(screen, ui)
+    
+    return session, ui, renderer
 
 # Main game loop
 def main():
-    global score, game_state, current_weapon, high_scores, level, ducks_killed
-    global ducks_needed_for_next_level, time_remaining, difficulty
+    global game_state, difficulty
+    
+    create_window()
+    bake_assets()
+    particles.setup()
     
     # Try to create sound effects
     try:
         create_sound_effects()
     except Exception as e:
         print(f"Could not create sound effects: {e}")
+    audio.setup()
+    
+    open_high_score_store()
     
-    player, ducks, projectiles, powerups, ui, powerup_timer, game_timer = init_game()
+    session, ui, renderer = init_game()
+    if load_quick_resume(session):
+        # Pick up the interrupted game paused, over its last frame
+        difficulty = session.difficulty
+        session.recorder = None  # The input log can't start mid-game
+        renderer.draw(session)
+        game_state = GameState.PAUSED
+    else:
+        # A snapshot that failed partway through may have changed the session, so start from a new one
+        session, ui, renderer = init_game(ui, renderer)
+    shown_state = None
+    profiler = FrameProfiler()
+    
+    # Fixed-timestep state: unsimulated time, input waiting for the next tick and skipped draws
+    accumulator = 0.0
+    inputs = InputCollector()
+    inputs.setup()
+    frames_skipped = 0
     
     running = True
     while running:
+        # Anything cached for the previous screen is stale after a state change
+        if game_state != shown_state:
+            ui.invalidate()
+            renderer.invalidate()
+            if shown_state == GameState.PLAYING:
+                audio.stop()  # Game sounds don't carry over into the pause, menu or game over screens
+            shown_state = game_state
+            accumulator = 0.0
+            inputs.clear()
+            clock.tick()  # Don't count time spent on other screens as game time
+        
         # Handle game state
         if game_state == GameState.MENU:
-            screen.fill(BLUE)
             start_button, diff_buttons = ui.draw_menu(screen)
+            ui.present()
             
-            for event in pygame.event.get():
+            for event in wait_for_events(1000 // MENU_ANIMATION_FPS):
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    ui.redraw()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     mouse_pos = pygame.mouse.get_pos()
                     
                     # Check start button
                     if start_button.collidepoint(mouse_pos):
-                        player, ducks, projectiles, powerups, ui, powerup_timer, game_timer = init_game()
+                        session, ui, renderer = init_game(ui, renderer)
                     
                     # Check difficulty buttons
                     for button, diff_level in diff_buttons:
@@ -953,155 +3633,100 @@ def main():
                             difficulty = diff_level
         
         elif game_state == GameState.PLAYING:
-            # Draw background
-            screen.blit(ui.background, (0, 0))
-            
-            # Update game timer
-            game_timer += 1
-            if game_timer % FPS == 0:  # Every second
-                time_remaining -= 1
-                if time_remaining <= 0:
-                    game_state = GameState.GAME_OVER
-                    # Update high scores
-                    if score > min(high_scores):
-                        high_scores.append(score)
-                        high_scores.sort(reverse=True)
-                        high_scores = high_scores[:5]  # Keep only top 5
+            # Bank real time, capped so a long stall can't demand unbounded catch-up
+            accumulator += min(clock.tick(MAX_RENDER_FPS) / 1000, MAX_CATCH_UP_TICKS * TICK_TIME)
+            frame_time = time.perf_counter()  # Real time the accumulator is measured up to
             
-            # Update power-up timer
-            powerup_timer -= 1
-            if powerup_timer <= 0:
-                # Spawn a power-up
-                powerup_type = random.choice(list(PowerUpType))
-                x = random.randint(50, SCREEN_WIDTH - 50)
-                powerups.append(PowerUp(x, 0, powerup_type))
-                powerup_timer = random.randint(FPS * 10, FPS * 20)  # 10-20 seconds
+            recording = profiler.is_recording()
+            timer = profiler if recording else None
+            session.phase_timer = timer
+            renderer.phase_timer = timer
+            if recording:
+                profiler.begin_frame()
             
             # Handle events
-            for event in pygame.event.get():
+            for event in inputs.collect(pygame.event.get(), ui, frame_time):
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         game_state = GameState.PAUSED
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    # Check if weapon button was clicked
-                    weapon_type = ui.check_weapon_button_click(event.pos)
-                    if weapon_type:
-                        if player.weapons[weapon_type].ammo != 0:  # Only switch if ammo available
-                            player.change_weapon(weapon_type)
-                    else:
-                        # Shoot
-                        new_projectiles = player.shoot()
-                        projectiles.extend(new_projectiles)
-            
-            # Update player
-            player.update()
-            
-            # Update ducks
-            for duck in ducks:
-                duck.update()
-                duck.draw(screen)
-            
-            # Update projectiles
-            for proj in projectiles[:]:
-                proj.update()
-                proj.draw(screen)
-                
-                # Check for collisions with ducks
-                for duck in ducks[:]:
-                    if duck.get_rect().collidepoint(proj.x, proj.y):
-                        if duck.hit(proj.damage):
-                            score += duck.score_value
-                            ducks_killed += 1
-                            
-                            # Check for level up
-                            if ducks_killed >= ducks_needed_for_next_level:
-                                level += 1
-                                ducks_killed = 0
-                                ducks_needed_for_next_level = 10 * level
-                                time_remaining += 30  # Add time for next level
-                                
-                                # Play level up sound
-                                if "level_up" in sounds:
-                                    sounds["level_up"].play()
-                                
-                                # Spawn new ducks based on new level
-                                ducks.remove(duck)
-                                num_new_ducks = 3 + (level - 1) + difficulty
-                                for i in range(num_new_ducks):
-                                    if level >= 3 and random.random() < 0.2:
-                                        ducks.append(Duck(DuckType.GOLDEN))
-                                    elif level >= 2 and random.random() < 0.3:
-                                        ducks.append(Duck(DuckType.FAST))
-                                    elif level >= 2 and random.random() < 0.3:
-                                        ducks.append(Duck(DuckType.ARMORED))
-                                    else:
-                                        ducks.append(Duck(DuckType.NORMAL))
-                            else:
-                                # Just replace the duck
-                                ducks.remove(duck)
-                                
-                                # Determine duck type based on level
-                                if level >= 3 and random.random() < 0.2:
-                                    ducks.append(Duck(DuckType.GOLDEN))
-                                elif level >= 2 and random.random() < 0.3:
-                                    ducks.append(Duck(DuckType.FAST))
-                                elif level >= 2 and random.random() < 0.3:
-                                    ducks.append(Duck(DuckType.ARMORED))
-                                else:
-                                    ducks.append(Duck(DuckType.NORMAL))
-                        
-                        # Remove projectile after hit
-                        if proj in projectiles:
-                            projectiles.remove(proj)
-                        break
-                
-                # Remove projectiles that are out of bounds
-                if proj in projectiles and proj.is_out_of_bounds():
-                    projectiles.remove(proj)
+                    elif event.key == pygame.K_F3:
+                        profiler.toggle()
+                        renderer.invalidate()
+                    elif event.key == pygame.K_F4:
+                        profiler.dump_chrome_trace()
+                    elif event.key == pygame.K_F5:
+                        profiler.start_cprofile()
+            if recording:
+                profiler.mark("events")
             
-            # Update power-ups
-            for powerup in powerups[:]:
-                powerup.update()
-                powerup.draw(screen)
-                
-                # Check for collision with player's crosshair
-                if powerup.get_rect().collidepoint(player.x, player.y):
-                    powerup_type, duration = powerup.activate()
-                    player.activate_powerup(powerup_type, duration)
-                    powerups.remove(powerup)
-                
-                # Remove power-ups that are out of bounds
-                if powerup.is_out_of_bounds():
-                    powerups.remove(powerup)
+            # Run as many fixed ticks as the elapsed time covers
+            ticks = 0
+            while accumulator >= TICK_TIME and ticks < MAX_CATCH_UP_TICKS and not session.game_over:
+                session.step(inputs.get_tick_input(frame_time - accumulator))
+                audio.flush()
+                particles.update()
+                accumulator -= TICK_TIME
+                ticks += 1
+                if session.game_timer % QUICK_RESUME_INTERVAL == 0 and not session.game_over:
+                    save_quick_resume(session)
+                if recording:
+                    # Sound, particles and quick-resume saves between ticks
+                    profiler.mark("particles")
+            if ticks == MAX_CATCH_UP_TICKS:
+                accumulator = min(accumulator, TICK_TIME)  # Too far behind, drop the backlog
             
-            # Draw player
-            player.draw(screen)
+            if session.game_over:
+                game_state = GameState.GAME_OVER
+                clear_quick_resume()
+                record_high_score(session)
+                if session.recorder is not None:
+                    save_replay(session)
             
-            # Draw UI
-            ui.draw_hud(screen, score, player, level, ducks_killed, ducks_needed_for_next_level, time_remaining)
+            # Under load, spend a few frames on simulation only
+            if ticks > 1 and frames_skipped < MAX_FRAME_SKIP:
+                frames_skipped += 1
+            else:
+                frames_skipped = 0
+                if profiler.enabled:
+                    # The overlay isn't tracked by dirty rects, so redraw everything under it
+                    renderer.invalidate()
+                # The crosshair follows the mouse as of this frame rather than the last tick
+                renderer.draw(session, min(1.0, accumulator / TICK_TIME), inputs.mouse_pos)
+                if profiler.enabled:
+                    profiler.draw(screen)
+                    profiler.mark("profiler")
+                renderer.present()
+            if recording:
+                profiler.end_frame()
         
         elif game_state == GameState.GAME_OVER:
-            restart_button, menu_button = ui.draw_game_over(screen, score)
+            restart_button, menu_button = ui.draw_game_over(screen, session.score)
+            ui.present()
             
-            for event in pygame.event.get():
+            for event in wait_for_events(IDLE_WAIT_TIMEOUT):
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    ui.redraw()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     mouse_pos = pygame.mouse.get_pos()
                     
                     if restart_button.collidepoint(mouse_pos):
-                        player, ducks, projectiles, powerups, ui, powerup_timer, game_timer = init_game()
+                        session, ui, renderer = init_game(ui, renderer)
                     elif menu_button.collidepoint(mouse_pos):
                         game_state = GameState.MENU
         
         elif game_state == GameState.PAUSED:
             resume_button, menu_button = ui.draw_pause_menu(screen)
+            ui.present()
             
-            for event in pygame.event.get():
+            for event in wait_for_events(IDLE_WAIT_TIMEOUT):
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    ui.redraw()
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         game_state = GameState.PLAYING
@@ -1111,13 +3736,42 @@ def main():
                     if resume_button.collidepoint(mouse_pos):
                         game_state = GameState.PLAYING
                     elif menu_button.collidepoint(mouse_pos):
+                        clear_quick_resume()
                         game_state = GameState.MENU
-        
-        pygame.display.flip()
-        clock.tick(FPS)
     
+    if quick_resume_writer is not None:
+        quick_resume_writer.join()
+    if high_score_store is not None:
+        high_score_store.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Duck Shooter")
+    parser.add_argument("--replay", metavar="PATH", help="Re-simulate a recorded replay headlessly and exit")
+    parser.add_argument("--seek", type=int, metavar="TICK", help="Stop the replay at this tick")
+    parser.add_argument("--headless", action="store_true", help="Play games with a bot and no window, printing JSON lines")
+    parser.add_argument("--bot", choices=list(BOTS), default="leading", help="Bot used by --headless")
+    parser.add_argument("--games", type=int, default=1, help="Games played by --headless")
+    parser.add_argument("--difficulty", type=int, choices=(1, 2, 3), default=1)
+    parser.add_argument("--seed", type=int, help="Seed of the first headless game; game i uses seed + i")
+    parser.add_argument("--max-level", type=int, help="Stop a headless game once it passes this level")
+    parser.add_argument("--max-ticks", type=int, help="Stop a headless game after this many ticks")
+    parser.add_argument("--entity-store", action="store_true", help="Run headless games on the NumPy entity store")
+    parser.add_argument("--output", help="Write headless stats here instead of stdout")
+    parser.add_argument("--balance", action="store_true",
+                        help="Play --games bot games per point of the --sweep grid on all cores and write a report")
+    parser.add_argument("--sweep", action="append", default=[], metavar="NAME=V1,V2",
+                        help="Balance parameter values to try, e.g. kills_per_level=5,10 or weapon.GUN.damage=1,2,3")
+    parser.add_argument("--workers", type=int, help="Worker processes for --balance (default: all cores)")
+    parser.add_argument("--report", default=BALANCE_REPORT_PATH, help="Where --balance writes its report")
+    args = parser.parse_args()
+    if args.replay:
+        sys.exit(run_replay(args.replay, args.seek))
+    if args.balance:
+        sys.exit(run_balance(args.sweep, args.bot, args.games, args.difficulty, args.seed, args.max_level,
+                             args.max_ticks, args.workers, args.report))
+    if args.headless:
+        sys.exit(run_headless(args.bot, args.games, args.difficulty, args.seed, args.max_level, args.max_ticks,
+                              args.entity_store, args.output))
     main()
\ No newline at end of file